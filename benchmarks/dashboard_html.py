@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Size and load-time report for the interactive scenario chart of notebook 06:
+plotly.express.line over the full frame, as plain JSON lists (plotly < 6)
+and as installed, against dashboard.line_payload (LTTB-downsampled traces,
+base64 typed arrays).
+
+Uses a synthetic scenario x country x year frame. Sizes are of standalone
+HTML pages with plotly.js from the CDN, so they measure the embedded data.
+Load time is the browser-independent part: parsing the figure JSON and
+decoding its arrays, best of --repeat.
+
+    python benchmarks/dashboard_html.py [--scenarios 4] [--countries 200] [--years 1000] [--max-points 250]
+"""
+
+import argparse
+import base64
+import json
+import time
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from energy_analysis.dashboard import line_payload
+
+
+def synthetic_scenarios(n_scenarios, n_countries, n_years, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_scenarios * n_countries * n_years
+    steps = rng.normal(0.01, 0.05, size=(n_scenarios * n_countries, n_years))
+    return pd.DataFrame({
+        "scenario": np.repeat([f"scenario_{i}" for i in range(n_scenarios)], n_countries * n_years),
+        "country": np.tile(np.repeat([f"country_{i:03d}" for i in range(n_countries)], n_years), n_scenarios),
+        "year": np.tile(np.arange(2050 - n_years, 2050), n_scenarios * n_countries),
+        "cons_adj": np.exp(np.cumsum(steps, axis=1)).ravel() * 100,
+    }).iloc[:n]
+
+
+def as_lists(obj):
+    """Figure JSON with typed arrays expanded to plain lists, as plotly < 6 wrote it."""
+    if isinstance(obj, dict):
+        if "bdata" in obj:
+            return np.frombuffer(base64.b64decode(obj["bdata"]), dtype="<" + obj["dtype"]).tolist()
+        return {k: as_lists(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [as_lists(v) for v in obj]
+    return obj
+
+
+def load(figure_json):
+    """Parse the figure JSON and materialise every array, as the page does on load."""
+    fig = json.loads(figure_json)
+    for trace in fig["data"]:
+        for axis in ("x", "y"):
+            a = trace[axis]
+            if isinstance(a, dict):
+                np.frombuffer(base64.b64decode(a["bdata"]), dtype="<" + a["dtype"])
+            else:
+                np.asarray(a, dtype="float64")
+
+
+def report(label, figure, repeat):
+    figure_json = pio.to_json(figure, validate=False)
+    html = pio.to_html(figure, include_plotlyjs="cdn", validate=False)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(figure_json)
+        times.append(time.perf_counter() - start)
+    points = sum(len(t["x"]) if isinstance(t["x"], list) else len(base64.b64decode(t["x"]["bdata"]))
+                 // int(t["x"]["dtype"][1]) for t in figure["data"])
+    print(f"{label:<34} {len(html) / 2**20:9.2f} MB {min(times) * 1e3:9.1f} ms {points:>11,} points")
+    return len(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", type=int, default=4)
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--years", type=int, default=1000)
+    parser.add_argument("--max-points", type=int, default=250)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_scenarios(args.scenarios, args.countries, args.years)
+    print(f"Frame: {len(df):,} rows")
+    print(f"{'':<34} {'HTML':>12} {'load':>12} {'':>18}")
+
+    start = time.perf_counter()
+    fig = px.line(df, x="year", y="cons_adj", color="scenario", line_group="country").to_plotly_json()
+    t_px = time.perf_counter() - start
+    start = time.perf_counter()
+    payload = line_payload(df, "year", "cons_adj", color="scenario", line_group="country",
+                           max_points=args.max_points)
+    t_payload = time.perf_counter() - start
+
+    size_lists = report("px.line, JSON lists", as_lists(fig), args.repeat)
+    report("px.line, installed plotly", fig, args.repeat)
+    size_payload = report(f"line_payload (max {args.max_points} points)", payload, args.repeat)
+    print(f"build time: px.line {t_px:.2f} s, line_payload {t_payload:.2f} s; "
+          f"HTML {size_lists / size_payload:.0f}x smaller than JSON lists")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Compare the per-country gap filling in preprocessing.clean_df against the
+previous groupby().apply(lambda) implementation.
+
+Builds a synthetic 250-country x 150-year x 130-column table with ~30% missing
+values, checks both paths give identical output and prints their timings.
+
+    python benchmarks/fill_gaps.py [--countries 250] [--years 150] [--columns 130]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from energy_analysis.preprocessing import fill_gaps
+
+
+def synthetic_table(n_countries, n_years, n_columns, nan_frac=0.3, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_countries * n_years
+    values = rng.normal(size=(n, n_columns))
+    values[rng.random((n, n_columns)) < nan_frac] = np.nan
+    df = pd.DataFrame(values, columns=[f"indicator_{i}" for i in range(n_columns)])
+    df.insert(0, "country", np.repeat([f"country_{i:03d}" for i in range(n_countries)], n_years))
+    df.insert(1, "year", np.tile(np.arange(1900, 1900 + n_years), n_countries))
+    # Shuffle so the sort inside clean_df does real work
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def fill_gaps_apply(df, by="country"):
+    """The implementation clean_df used before fill_gaps."""
+    return df.groupby(by).apply(lambda g: g.ffill().bfill()).reset_index(drop=True)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--years", type=int, default=150)
+    parser.add_argument("--columns", type=int, default=130)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_table(args.countries, args.years, args.columns)
+    df = df.sort_values(["country", "year"])
+    print(f"Table: {df.shape[0]:,} rows x {df.shape[1]} columns")
+
+    t_apply, expected = best_of(lambda: fill_gaps_apply(df), args.repeat)
+    t_vec, result = best_of(lambda: fill_gaps(df), args.repeat)
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f"groupby().apply(lambda) : {t_apply * 1e3:9.1f} ms")
+    print(f"fill_gaps (vectorized)  : {t_vec * 1e3:9.1f} ms")
+    print(f"speedup                 : {t_apply / t_vec:9.1f}x  (outputs identical)")
+
+
+if __name__ == "__main__":
+    main()
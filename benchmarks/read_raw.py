@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Memory report for reading a raw OWID-style CSV with default pandas dtypes
+versus the schema-driven preprocessing.read_raw.
+
+Each reader runs in a fresh process so peak RSS is measured in isolation.
+Without a path, a synthetic 250-country x 150-year x 130-column file is used.
+
+    python benchmarks/read_raw.py [data/raw/sample_energy.csv]
+"""
+
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from energy_analysis.preprocessing import memory_mb, read_raw
+
+
+def synthetic_csv(path, n_countries=250, n_years=150, n_columns=130, nan_frac=0.4, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_countries * n_years
+    values = rng.lognormal(3, 2, size=(n, n_columns))
+    values[rng.random((n, n_columns)) < nan_frac] = np.nan
+    df = pd.DataFrame(values, columns=[f"indicator_{i}" for i in range(n_columns)])
+    df[df.columns[-5:]] = np.nan  # OWID ships columns that are empty for a dataset
+    df.insert(0, "country", np.repeat([f"country_{i:03d}" for i in range(n_countries)], n_years))
+    df.insert(1, "year", np.tile(np.arange(1900, 1900 + n_years), n_countries))
+    df.insert(2, "iso_code", np.repeat([f"C{i:03d}" for i in range(n_countries)], n_years))
+    df.insert(3, "population", rng.integers(10**5, 10**9, size=n).astype(float))
+    df.to_csv(path, index=False)
+
+
+def peak_rss_mb():
+    scale = 1e6 if sys.platform == "darwin" else 1e3  # bytes on macOS, KiB elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run(reader, path):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if reader == "pandas defaults":
+        df = pd.read_csv(path).dropna(axis=1, how="all")
+    else:
+        df = read_raw(path)
+    read_s = time.perf_counter() - start
+    start = time.perf_counter()
+    df.groupby("country", observed=True).mean(numeric_only=True)
+    groupby_s = time.perf_counter() - start
+    return {"reader": reader, "frame MB": memory_mb(df), "peak RSS MB": peak_rss_mb() - baseline,
+            "read s": read_s, "groupby s": groupby_s, "columns": df.shape[1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("csv", nargs="?", help="raw CSV to read (default: synthetic)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.csv) if args.csv else Path(tmp) / "synthetic.csv"
+        if not args.csv:
+            synthetic_csv(path)
+        print(f"File: {path} ({path.stat().st_size / 1e6:.1f} MB on disk)")
+        rows = []
+        for reader in ("pandas defaults", "read_raw (schema)"):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                rows.append(pool.submit(run, reader, path).result())
+    report = pd.DataFrame(rows).set_index("reader")
+    print(report.round(3).to_string())
+    before, after = report.iloc[0], report.iloc[1]
+    print(f"frame memory: {before['frame MB'] / after['frame MB']:.1f}x smaller, "
+          f"peak RSS: {before['peak RSS MB'] / max(after['peak RSS MB'], 1e-9):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Time a per-country figure set rendered the old way (pyplot state machine,
+sns.set_theme and sns.lineplot, one figure after another) against
+demand.plot_country_demand (Figure API on Agg canvases, parallel workers).
+
+Uses a synthetic 300-country x 120-year consumption table.
+
+    python benchmarks/render_figures.py [--countries 300] [--years 120] [--workers N]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from energy_analysis.analysis.demand import plot_country_demand
+
+
+def synthetic_consumption(n_countries, n_years, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "country": np.repeat([f"country_{i:03d}" for i in range(n_countries)], n_years),
+        "year": np.tile(np.arange(1900, 1900 + n_years), n_countries),
+        "primary_energy_consumption": rng.lognormal(3, 1, n_countries * n_years),
+    })
+
+
+def plot_country_demand_pyplot(df, outdir):
+    """Per-country figures with the plotting code the demand module used before rendering.py."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    Path(outdir).mkdir(parents=True, exist_ok=True)
+    for country, group in df.groupby("country"):
+        sns.set_theme(style="whitegrid")
+        plt.figure(figsize=(8, 5))
+        sns.lineplot(data=group, x="year", y="primary_energy_consumption")
+        plt.title(f"Primary Energy Consumption: {country}")
+        plt.savefig(Path(outdir)/f"{country}.png", dpi=150)
+        plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--countries", type=int, default=300)
+    parser.add_argument("--years", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = synthetic_consumption(args.countries, args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        plot_country_demand_pyplot(df, Path(tmp)/"pyplot")
+        t_old = time.perf_counter() - start
+
+        start = time.perf_counter()
+        plot_country_demand(df, Path(tmp)/"agg", args.workers)
+        t_new = time.perf_counter() - start
+
+    print(f"pyplot + seaborn, serial : {t_old:7.2f} s")
+    print(f"Figure API, parallel     : {t_new:7.2f} s")
+    print(f"speedup                  : {t_old / t_new:7.1f}x  ({args.countries} figures)")
+
+
+if __name__ == "__main__":
+    main()
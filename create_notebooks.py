@@ -33,7 +33,7 @@ NOTEBOOKS = {
     "02_preprocessing.ipynb": [
         {"cell_type": "markdown", "source": "# 02_preprocessing\n\nClean and transform raw data to analysis-ready tables."},
         {"cell_type": "code", "source": "from energy_analysis.preprocessing import main\n\nif __name__ == '__main__':\n    main()"},
-        {"cell_type": "markdown", "source": "**Output**: Cleaned CSVs in `data/processed/`."}
+        {"cell_type": "markdown", "source": "**Output**: Cleaned tables in `data/processed/` (Parquet by default, see `data.storage` in config.yaml)."}
     ],
     "03_demand_side_analysis.ipynb": [
         {"cell_type": "markdown", "source": "# 03_demand_side_analysis\n\nExplore energy consumption and efficiency measures on the demand side."},
@@ -93,7 +93,7 @@ NOTEBOOKS = {
             "df = pd.read_csv('data/processed/scenario_results.csv')\n\n"
             "# Static Seaborn plot\n"
             "sns.set_theme(style='whitegrid', palette='muted')\n"
-            "plot_scenarios('data/processed/scenario_results.csv', outdir='figures')\n\n"
+            "plot_scenarios('data/processed/scenario_results', outdir='figures')\n\n"
             "# Interactive Plotly chart\n"
             "fig = px.line(df, x='year', y='cons_adj', color='scenario',\n"
             "              title='Scenario-adjusted Energy Consumption (Interactive)')\n"
@@ -8,7 +8,7 @@ setup(
     install_requires=[
         "pandas", "numpy", "matplotlib", "seaborn",
         "scikit-learn", "pyyaml", "nbconvert",
-        "statsmodels", "plotly", "requests"
+        "statsmodels", "scipy", "plotly>=6", "requests", "pyarrow"
     ],
     python_requires=">=3.8",
 )
@@ -0,0 +1,90 @@
+"""
+Summary statistics for plotting.
+
+Figures of long tables (every country x year x scenario) only need one
+point per line and x value. summarize reduces such a table to that point
+and, optionally, a confidence band, once and in vectorized passes, so the
+renderer only receives the small summary instead of re-aggregating and
+bootstrapping the raw rows on every draw.
+
+CI options:
+
+  - ``None``: no band.
+  - ``"normal"``: t-interval around the mean (or n times it for sums).
+  - ``"sd"``: estimate +/- one standard deviation of the rows.
+  - ``"bootstrap"``: percentile interval of ``n_boot`` resampled estimates.
+"""
+
+from typing import Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+BOOT_BLOCK = 2 ** 22  # resampled values held in memory per block of bootstrap rounds
+
+
+def _bootstrap(values, codes, sizes, n_boot, level, rng, estimator):
+    """Percentile interval of the per-group ``estimator`` over ``n_boot`` resamples within each group."""
+    order = np.argsort(codes, kind="stable")
+    values, codes = values[order], codes[order]
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    block = max(1, BOOT_BLOCK // max(len(values), 1))
+    est = np.empty((n_boot, len(sizes)))
+    for lo in range(0, n_boot, block):
+        k = min(block, n_boot - lo)
+        idx = starts[codes] + (rng.random((k, len(values))) * sizes[codes]).astype(np.int64)
+        est[lo:lo + k] = np.add.reduceat(values[idx], starts, axis=1)
+    if estimator == "mean":
+        est /= sizes
+    alpha = (1 - level) / 2
+    return np.quantile(est, [alpha, 1 - alpha], axis=0)
+
+
+def summarize(
+    df: pd.DataFrame,
+    y: str,
+    x: str = "year",
+    by: Union[str, Sequence[str], None] = None,
+    estimator: str = "mean",
+    ci: Optional[str] = "normal",
+    level: float = 0.95,
+    n_boot: int = 1000,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    ``estimator`` ("mean" or "sum") of ``y`` per ``by`` group and ``x``,
+    with ``low``/``high`` bounds from ``ci`` (see the module docstring) and
+    the row count ``n``. Missing ``y`` values are ignored.
+    """
+    if estimator not in ("mean", "sum"):
+        raise ValueError(f"estimator must be 'mean' or 'sum', got '{estimator}'")
+    keys = ([by] if isinstance(by, str) else list(by or [])) + [x]
+    data = df.loc[df[y].notna(), keys + [y]]
+    grouped = data.groupby(keys, observed=True, sort=True)[y]
+    out = grouped.agg(["mean", "std", "count"]).rename(columns={"count": "n"})
+    n = out["n"].to_numpy(dtype="float64")
+    scale = n if estimator == "sum" else 1.0
+    estimate = out["mean"].to_numpy() * scale
+
+    if ci is None:
+        low = high = np.full(len(out), np.nan)
+    elif ci == "normal":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            half = stats.t.ppf(0.5 + level / 2, n - 1) * out["std"].to_numpy() / np.sqrt(n) * scale
+        low, high = estimate - half, estimate + half
+    elif ci == "sd":
+        sd = out["std"].to_numpy()
+        low, high = estimate - sd, estimate + sd
+    elif ci == "bootstrap":
+        codes = grouped.ngroup().to_numpy()
+        low, high = _bootstrap(data[y].to_numpy(dtype="float64"), codes, n.astype(np.int64),
+                               n_boot, level, np.random.default_rng(seed), estimator)
+    else:
+        raise ValueError(f"ci must be None, 'normal', 'sd' or 'bootstrap', got '{ci}'")
+
+    out = out.index.to_frame(index=False)
+    out[y] = estimate
+    out["low"] = low
+    out["high"] = high
+    out["n"] = n.astype(np.int64)
+    return out
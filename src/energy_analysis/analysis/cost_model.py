@@ -1,22 +1,27 @@
 """Plot levelized cost of energy with robust column inference."""
+from functools import lru_cache
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
+from typing import Mapping, NamedTuple, Optional, Tuple, Union
 import pandas as pd
-from energy_analysis.analysis.learning_curve import learning_curve
+from energy_analysis.analysis.learning_curve import DEFAULT_LEARNING_RATE, grouped_learning_curve
+from energy_analysis.analysis.learning_fit import fit_learning_rates
+from energy_analysis.analysis.lcoe import DEFAULTS as LCOE_DEFAULTS, lcoe_table
+from energy_analysis.rendering import FigureSpec, lines, render
 
-def plot_lcoe(
-    df: pd.DataFrame,
-    tech_col: str = "technology",
-    cost_col: str = "capex",
-    year_col: str = "year",
-    cum_col: str = "cumulative_capacity",
-    outdir: str = "figures"
-):
-    # Ensure output directory exists
-    Path(outdir).mkdir(exist_ok=True)
-    cols = df.columns.tolist()
-    print(f"ℹ️  DataFrame columns detected: {cols}")
+DEFAULT_DISCOUNT_RATE = 0.07
+
+class CostSchema(NamedTuple):
+    """Resolved column names; ``tech`` is None when all rows form a single technology."""
+    tech: Optional[str]
+    cost: str
+    year: str
+    notes: Tuple[str, ...] = ()
+
+@lru_cache(maxsize=128)
+def _resolve(columns: Tuple[Tuple[str, bool], ...], tech_col: str, cost_col: str, year_col: str) -> CostSchema:
+    cols = [c for c, _ in columns]
+    numeric = [c for c, is_numeric in columns if is_numeric]
+    notes = []
 
     # Helper to match column patterns case‐insensitively
     def find_first(patterns):
@@ -27,68 +32,119 @@ def plot_lcoe(
         return None
 
     # Infer technology column
+    tech = tech_col
     if tech_col not in cols:
-        inferred = find_first(["tech", "name"])
-        if inferred:
-            old = tech_col
-            tech_col = inferred
-            print(f"⚠️  Inferred tech column '{tech_col}' (was '{old}')")
+        tech = find_first(["tech", "name"])
+        if tech:
+            notes.append(f"⚠️  Inferred tech column '{tech}' (was '{tech_col}')")
         else:
-            print("⚠️  No tech-like column found, grouping all data under a single category.")
-            df["_all_tech_"] = "all"
-            tech_col = "_all_tech_"
+            notes.append("⚠️  No tech-like column found, grouping all data under a single category.")
 
     # Infer cost column
+    cost = cost_col
     if cost_col not in cols:
-        inferred = find_first(["cost", "capex", "price"])
-        if inferred:
-            old = cost_col
-            cost_col = inferred
-            print(f"⚠️  Inferred cost column '{cost_col}' (was '{old}')")
+        cost = find_first(["cost", "capex", "price"])
+        if cost:
+            notes.append(f"⚠️  Inferred cost column '{cost}' (was '{cost_col}')")
+        elif numeric:
+            cost = numeric[0]
+            notes.append(f"⚠️  Using first numeric column '{cost}' for cost (was '{cost_col}')")
         else:
-            numeric = [c for c in cols if pd.api.types.is_numeric_dtype(df[c])]
-            if numeric:
-                old = cost_col
-                cost_col = numeric[0]
-                print(f"⚠️  Using first numeric column '{cost_col}' for cost (was '{old}')")
-            else:
-                raise KeyError("No suitable numeric column found for cost_col.")
+            raise KeyError("No suitable numeric column found for cost_col.")
 
     # Infer year column
+    year = year_col
     if year_col not in cols:
-        inferred = find_first(["year", "date"])
-        if inferred:
-            old = year_col
-            year_col = inferred
-            print(f"⚠️  Inferred year column '{year_col}' (was '{old}')")
+        year = find_first(["year", "date"])
+        if year:
+            notes.append(f"⚠️  Inferred year column '{year}' (was '{year_col}')")
+        elif numeric:
+            year = numeric[0]
+            notes.append(f"⚠️  Using first numeric column '{year}' for year (was '{year_col}')")
         else:
-            numeric = [c for c in cols if pd.api.types.is_numeric_dtype(df[c])]
-            if numeric:
-                old = year_col
-                year_col = numeric[0]
-                print(f"⚠️  Using first numeric column '{year_col}' for year (was '{old}')")
-            else:
-                raise KeyError("No suitable column found for year_col.")
+            raise KeyError("No suitable column found for year_col.")
+
+    return CostSchema(tech, cost, year, tuple(notes))
+
+def resolve_schema(
+    df: pd.DataFrame,
+    tech_col: str = "technology",
+    cost_col: str = "capex",
+    year_col: str = "year"
+) -> CostSchema:
+    """
+    Map the requested tech/cost/year columns onto ``df``, inferring missing
+    ones by name and falling back to the first numeric column. The result
+    is cached per schema (column names and whether each is numeric), so
+    repeated calls on same-shaped frames skip the scans.
+    """
+    columns = tuple((c, pd.api.types.is_numeric_dtype(t)) for c, t in df.dtypes.items())
+    return _resolve(columns, tech_col, cost_col, year_col)
 
-    # Apply a seaborn theme
-    sns.set_theme(style="darkgrid")
+def cost_frame(
+    df: pd.DataFrame,
+    tech_col: str = "technology",
+    cost_col: str = "capex",
+    year_col: str = "year",
+    cum_col: str = "cumulative_capacity",
+    learning_rate: Union[float, Mapping, str] = DEFAULT_LEARNING_RATE,
+    schema: Optional[CostSchema] = None,
+    discount_rate: float = DEFAULT_DISCOUNT_RATE
+) -> pd.DataFrame:
+    """
+    Technology, year and cost per row of ``df`` (same index), without
+    modifying ``df`` or touching matplotlib.
 
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(9, 6))
-    for tech, group in df.groupby(tech_col):
-        x = group[year_col]
-        y = group[cost_col]
-        # If cumulative capacity is available, apply learning curve adjustment
-        if cum_col in group:
-            y = learning_curve(y, group[cum_col])
-        ax.plot(x, y, marker="o", label=str(tech))
+    If cumulative capacity is available, cost follows the learning curve for
+    every technology at once; ``learning_rate`` may be a per-technology
+    mapping, or "fit" to estimate each technology's exponent from the data.
+    If ``df`` also has a ``capacity_factor`` column, the (learning-adjusted)
+    cost is taken as capex in $/kW and the returned cost is the LCOE in
+    $/MWh at ``discount_rate``, with any of the optional lcoe_table columns
+    (fixed_opex, lifetime, ...) that ``df`` has.
+    """
+    schema = schema or resolve_schema(df, tech_col, cost_col, year_col)
+    tech = df[schema.tech] if schema.tech else pd.Series("all", index=df.index)
+    if cum_col in df:
+        data = pd.DataFrame({"technology": tech, "cost": df[schema.cost], "cum": df[cum_col]})
+        if isinstance(learning_rate, str) and learning_rate == "fit":
+            fitted = fit_learning_rates(data, "technology", "cost", "cum")
+            print("📈 Fitted learning rates per doubling:\n"
+                  f"{fitted[['n', 'learning_rate', 'learning_rate_low', 'learning_rate_high']].round(3).to_string()}")
+            learning_rate = fitted["exponent"].dropna()
+        cost = grouped_learning_curve(data, "technology", "cost", "cum", learning_rate)
+    else:
+        cost = df[schema.cost]
+    if "capacity_factor" in df:
+        extra = [c for c in LCOE_DEFAULTS if c in df]
+        inputs = df[["capacity_factor"] + extra].assign(capex=cost)
+        cost = pd.Series(lcoe_table(inputs, [discount_rate], keys=())["lcoe"].to_numpy(), index=df.index)
+    return pd.DataFrame({"technology": tech, "year": df[schema.year], "cost": cost})
 
-    ax.set_xlabel(year_col)
-    ax.set_ylabel(cost_col)
-    ax.set_title("Levelized Cost of Energy")
-    ax.legend()
+def plot_lcoe(
+    df: pd.DataFrame,
+    tech_col: str = "technology",
+    cost_col: str = "capex",
+    year_col: str = "year",
+    cum_col: str = "cumulative_capacity",
+    outdir: str = "figures",
+    learning_rate: Union[float, Mapping, str] = DEFAULT_LEARNING_RATE,
+    discount_rate: float = DEFAULT_DISCOUNT_RATE
+):
+    print(f"ℹ️  DataFrame columns detected: {df.columns.tolist()}")
+    schema = resolve_schema(df, tech_col, cost_col, year_col)
+    for note in schema.notes:
+        print(note)
+    costs = cost_frame(df, tech_col, cost_col, year_col, cum_col, learning_rate, schema, discount_rate)
+    if "capacity_factor" in df:
+        ylabel = f"LCOE ($/MWh, {discount_rate:.0%} discount rate)"
+    else:
+        ylabel = schema.cost
 
-    # Save figure
-    out_file = Path(outdir) / "lcoe_plot.png"
-    fig.savefig(out_file, dpi=300, bbox_inches="tight")
-    print(f"🖼️  Saved LCOE plot to {out_file}")
\ No newline at end of file
+    # Render headless with a seaborn darkgrid theme
+    out_file = render(FigureSpec(
+        str(Path(outdir) / "lcoe_plot.png"), lines,
+        dict(data=costs, x="year", y="cost", hue="technology", marker="o"),
+        title="Levelized Cost of Energy", xlabel=schema.year, ylabel=ylabel,
+        figsize=(9, 6), dpi=300, style="darkgrid", legend=True, tight=True))
+    print(f"🖼️  Saved LCOE plot to {out_file}")
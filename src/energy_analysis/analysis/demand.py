@@ -1,18 +1,148 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
+from scipy.ndimage import maximum_filter1d
+from energy_analysis.aggregation import summarize
+from energy_analysis.preprocessing import compute_per_capita
+from energy_analysis.rendering import FigureSpec, lines, render, render_all
+from energy_analysis.storage import read_table
 
-def load_consumption(procdir):
-    return pd.read_csv(Path(procdir) / "sample_energy.csv")
+def load_consumption(procdir, columns=("year", "primary_energy_consumption")):
+    return read_table(Path(procdir) / "sample_energy", columns=columns)
+
+def _country_year_grid(df, columns):
+    """(countries, years) arrays of ``columns``, NaN where a country has no row for a year."""
+    country = df["country"].astype("category")
+    years = df["year"].to_numpy(dtype=np.int64)
+    first = years.min() if len(years) else 0
+    span = (years.max() - first + 1) if len(years) else 0
+    rows, cols = country.cat.codes.to_numpy(), years - first
+    grids = {}
+    for c in columns:
+        grid = np.full((len(country.cat.categories), span), np.nan)
+        grid[rows, cols] = df[c].to_numpy(dtype="float64")
+        grids[c] = grid
+    return country.cat.categories, np.arange(first, first + span), grids
+
+def lmdi_decomposition(df, periods=1, base_year=None, pop_col="population", gdp_col="gdp",
+                       val_col="primary_energy_consumption"):
+    """
+    Additive LMDI-I decomposition of the change in consumption E = P * (G / P) * (E / G)
+    into population, GDP-per-capita and energy-intensity effects.
+
+    Each country-year is compared with ``periods`` years earlier, or with
+    ``base_year`` when given. With L the logarithmic mean of the two
+    consumption levels, each effect is L * ln(factor_t / factor_0), and the
+    three add up exactly to the change. Pairs with a missing or
+    non-positive factor are left out.
+    """
+    data = compute_per_capita(df[["country", "year", pop_col, gdp_col, val_col]].copy(), pop_col, val_col)
+    countries, years, g = _country_year_grid(data, [val_col, pop_col, gdp_col, "energy_per_capita"])
+    gdp_per_capita = g[gdp_col] / g[pop_col]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.log(np.stack([g[val_col], g[pop_col], gdp_per_capita, g["energy_per_capita"] / gdp_per_capita]))
+
+    if base_year is None:
+        now, then = logs[:, :, periods:], logs[:, :, :-periods]
+        year_from, year_to = years[:-periods], years[periods:]
+    elif len(years) and years[0] <= base_year <= years[-1]:
+        now, then = logs, logs[:, :, [base_year - years[0]]]
+        year_from, year_to = np.full(len(years), base_year), years
+    else:
+        raise ValueError(f"base_year {base_year} is outside the data's years")
+    diff = now - then
+    e1, e0 = np.exp(now[0]), np.broadcast_to(np.exp(then[0]), diff.shape[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(diff[0] == 0, e0, (e1 - e0) / diff[0])
+    ok = np.isfinite(diff).all(axis=0)
+    c, t = np.nonzero(ok)
+    return pd.DataFrame({
+        "country": countries[c],
+        "year_from": year_from[t],
+        "year": year_to[t],
+        "consumption_change": (e1 - e0)[c, t],
+        "population_effect": (weight * diff[1])[c, t],
+        "gdp_per_capita_effect": (weight * diff[2])[c, t],
+        "intensity_effect": (weight * diff[3])[c, t],
+    })
+
+def _window_sum(values, pos, window):
+    """Sum and count of the non-missing values in each trailing ``window`` within a group, in O(n)."""
+    ok = ~np.isnan(values)
+    csum = np.r_[0.0, np.cumsum(np.where(ok, values, 0.0))]
+    ccount = np.r_[0, np.cumsum(ok)]
+    i = np.arange(len(values))
+    lo = np.maximum(i + 1 - window, i - pos)
+    return csum[i + 1] - csum[lo], ccount[i + 1] - ccount[lo]
+
+def demand_trends(df, window=5, peak_window=5, min_periods=None, by="country",
+                  val_col="primary_energy_consumption"):
+    """
+    Per country-year trend statistics of ``val_col``, computed on one
+    country-sorted array with cumulative-sum and sliding-max kernels.
+
+    - ``yoy_change`` / ``yoy_pct``: change from the previous observation.
+    - ``moving_average``: mean of the last ``window`` observations, given at
+      least ``min_periods`` (default ``window``) non-missing ones.
+    - ``rolling_cagr``: compound annual growth from ``window`` observations
+      back, over the years actually elapsed.
+    - ``is_peak``: the value is the maximum of the centred ``peak_window``
+      observations around it, all in the same country.
+    """
+    min_periods = window if min_periods is None else min_periods
+    data = df[[by, "year", val_col]].sort_values([by, "year"], kind="stable").reset_index(drop=True)
+    values = data[val_col].to_numpy(dtype="float64")
+    years = data["year"].to_numpy(dtype="float64")
+    n = len(values)
+    key = pd.factorize(data[by])[0]
+    new_group = np.r_[True, key[1:] != key[:-1]]
+    start = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+    pos = np.arange(n) - start
+    size = np.bincount(key)[key] if n else key
+
+    prev = np.where(pos >= 1, np.roll(values, 1), np.nan)
+    total, count = _window_sum(values, pos, window)
+    lag = np.where(pos >= window, np.arange(n) - window, 0)
+    back, span = np.where(pos >= window, values[lag], np.nan), years - years[lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = values / back
+        cagr = np.where((ratio > 0) & (span > 0), ratio ** (1 / span) - 1, np.nan)
+        out = data.assign(
+            yoy_change=values - prev,
+            yoy_pct=values / prev - 1,
+            moving_average=np.where(count >= max(min_periods, 1), total / count, np.nan),
+            rolling_cagr=cagr,
+        )
+
+    # Sliding max over the array with a -inf gap between countries, so no
+    # window crosses into the next country
+    half = peak_window // 2
+    gapped = np.full(n + (key[-1] + 1 if n else 0) * half, -np.inf)
+    at = np.arange(n) + key * half
+    gapped[at] = np.where(np.isnan(values), -np.inf, values)
+    local_max = maximum_filter1d(gapped, size=2 * half + 1, mode="constant", cval=-np.inf)[at]
+    full = (pos >= half) & (pos < size - half)
+    out["is_peak"] = full & np.isfinite(values) & (values == local_max)
+    return out
 
 def plot_global_demand(df, outdir="figures"):
-    Path(outdir).mkdir(exist_ok=True)
-    sns.set_theme(style="whitegrid")
-    yearly = df.groupby("year")["primary_energy_consumption"].sum().reset_index()
-    plt.figure(figsize=(8,5))
-    sns.lineplot(data=yearly, x="year", y="primary_energy_consumption")
-    plt.title("Global Primary Energy Consumption Over Time")
-    plt.savefig(Path(outdir)/"global_demand.png", dpi=150)
-    plt.close()
-    print(f"Saved global demand plot to {outdir}/global_demand.png")
+    yearly = summarize(df, "primary_energy_consumption", estimator="sum", ci=None)
+    out = render(FigureSpec(
+        str(Path(outdir)/"global_demand.png"), lines,
+        dict(data=yearly, x="year", y="primary_energy_consumption"),
+        title="Global Primary Energy Consumption Over Time",
+        xlabel="year", ylabel="primary_energy_consumption"))
+    print(f"Saved global demand plot to {out}")
+
+def plot_country_demand(df, outdir="figures/countries", workers=None):
+    """One consumption-over-time PNG per country, rendered in parallel."""
+    specs = [
+        FigureSpec(str(Path(outdir)/f"{country}.png"), lines,
+                   dict(data=group, x="year", y="primary_energy_consumption"),
+                   title=f"Primary Energy Consumption: {country}",
+                   xlabel="year", ylabel="primary_energy_consumption")
+        for country, group in df.groupby("country", observed=True)
+    ]
+    paths = render_all(specs, workers)
+    print(f"Saved {len(paths)} country demand plots to {outdir}")
+    return paths
@@ -0,0 +1,82 @@
+"""
+Levelized cost of energy: discounted lifetime costs over discounted generation.
+
+With constant annual costs and output over the plant life, discounting both
+sides reduces to annualising the capital cost with the capital recovery
+factor CRF(r, n) = r (1 + r)^n / ((1 + r)^n - 1):
+
+    LCOE [$/MWh] = (capex * 1000 * CRF + fixed_opex * 1000) / (8760 * capacity_factor)
+                   + variable_opex + fuel_cost / efficiency
+
+with capex in $/kW, fixed_opex in $/kW-yr, variable_opex in $/MWh and
+fuel_cost in $/MWh of fuel energy. Every function broadcasts with NumPy,
+so a whole technology x region x year table is costed against a vector of
+discount rates in one evaluation.
+"""
+
+from typing import Dict, Sequence
+import numpy as np
+import pandas as pd
+
+HOURS_PER_YEAR = 8760
+KW_PER_MW = 1000
+DEFAULTS = {"fixed_opex": 0.0, "variable_opex": 0.0, "fuel_cost": 0.0, "efficiency": 1.0, "lifetime": 25}
+
+
+def capital_recovery_factor(rate, lifetime) -> np.ndarray:
+    """CRF for discount ``rate`` and ``lifetime`` years (1 / lifetime at a zero rate), broadcast."""
+    rate = np.asarray(rate, dtype="float64")
+    lifetime = np.asarray(lifetime, dtype="float64")
+    growth = (1 + rate) ** lifetime
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crf = rate * growth / (growth - 1)
+    return np.where(rate == 0, 1 / lifetime, crf)
+
+
+def lcoe_components(capex, capacity_factor, discount_rate, lifetime=DEFAULTS["lifetime"],
+                    fixed_opex=0.0, variable_opex=0.0, fuel_cost=0.0, efficiency=1.0) -> Dict[str, np.ndarray]:
+    """Capital, fixed O&M, variable O&M and fuel parts of the LCOE in $/MWh, broadcast over all inputs."""
+    mwh_per_mw = HOURS_PER_YEAR * np.asarray(capacity_factor, dtype="float64")
+    crf = capital_recovery_factor(discount_rate, lifetime)
+    capital = np.asarray(capex, dtype="float64") * KW_PER_MW * crf / mwh_per_mw
+    fixed = np.asarray(fixed_opex, dtype="float64") * KW_PER_MW / mwh_per_mw
+    variable = np.asarray(variable_opex, dtype="float64")
+    fuel = np.asarray(fuel_cost, dtype="float64") / np.asarray(efficiency, dtype="float64")
+    shape = np.broadcast_shapes(capital.shape, fixed.shape, variable.shape, fuel.shape)
+    return {name: np.broadcast_to(part, shape) for name, part in
+            (("capital", capital), ("fixed_om", fixed), ("variable_om", variable), ("fuel", fuel))}
+
+
+def lcoe(capex, capacity_factor, discount_rate, lifetime=DEFAULTS["lifetime"],
+         fixed_opex=0.0, variable_opex=0.0, fuel_cost=0.0, efficiency=1.0) -> np.ndarray:
+    """Total LCOE in $/MWh; see lcoe_components."""
+    return sum(lcoe_components(capex, capacity_factor, discount_rate, lifetime,
+                               fixed_opex, variable_opex, fuel_cost, efficiency).values())
+
+
+def lcoe_table(
+    df: pd.DataFrame,
+    discount_rates: Sequence[float],
+    keys: Sequence[str] = ("technology", "region", "year"),
+    components: bool = False
+) -> pd.DataFrame:
+    """
+    LCOE of every row of ``df`` at every discount rate.
+
+    ``df`` needs ``capex`` and ``capacity_factor`` columns; ``fixed_opex``,
+    ``variable_opex``, ``fuel_cost``, ``efficiency`` and ``lifetime`` are
+    optional (see DEFAULTS). Returns a long frame of the ``keys`` present in
+    ``df``, ``discount_rate`` and ``lcoe`` (plus the cost components with
+    ``components``), computed as one rows x rates broadcast.
+    """
+    rates = np.asarray(discount_rates, dtype="float64")
+    col = lambda name: (df[name].to_numpy(dtype="float64") if name in df else np.full(len(df), DEFAULTS[name]))[:, None]
+    parts = lcoe_components(
+        df["capex"].to_numpy(dtype="float64")[:, None], df["capacity_factor"].to_numpy(dtype="float64")[:, None],
+        rates[None, :], col("lifetime"), col("fixed_opex"), col("variable_opex"), col("fuel_cost"), col("efficiency"))
+    out = {k: np.repeat(df[k].to_numpy(), len(rates)) for k in keys if k in df}
+    out["discount_rate"] = np.tile(rates, len(df))
+    out["lcoe"] = sum(parts.values()).ravel()
+    if components:
+        out.update({name: part.ravel() for name, part in parts.items()})
+    return pd.DataFrame(out)
@@ -2,10 +2,12 @@
 Compute cost adjustment based on cumulative capacity using a simple learning curve.
 """
 
-from typing import Iterable
+from typing import Iterable, Mapping, Sequence, Union
 import pandas as pd
 import numpy as np
 
+DEFAULT_LEARNING_RATE = 0.1
+
 def learning_curve(
     costs: Iterable[float],
     cumulative_capacities: Iterable[float],
@@ -20,7 +22,42 @@ def learning_curve(
     - learning_rate: exponent factor (e.g., 0.1 for 10% learning).
     """
     costs = pd.Series(costs)
-    cum = pd.Series(cumulative_capacities).replace(0, np.nan).fillna(method="bfill").fillna(1.0)
+    cum = pd.Series(cumulative_capacities).replace(0, np.nan).bfill().fillna(1.0)
     base_cap = cum.iloc[0] if cum.iloc[0] > 0 else 1.0
     adjusted = costs * (base_cap / cum) ** learning_rate
-    return adjusted
\ No newline at end of file
+    return adjusted
+
+
+def grouped_learning_curve(
+    df: pd.DataFrame,
+    group_cols: Union[str, Sequence[str]] = "technology",
+    cost_col: str = "capex",
+    cum_col: str = "cumulative_capacity",
+    learning_rate: Union[float, Mapping, pd.Series] = DEFAULT_LEARNING_RATE
+) -> pd.Series:
+    """
+    Apply learning_curve to every group of ``df`` by ``group_cols`` (one
+    column or several, e.g. ["technology", "region"]) in one pass.
+
+    Each group's base capacity is its first cumulative capacity (in row
+    order, zeros back-filled within the group), exactly as learning_curve
+    does for one series. ``learning_rate`` is a single exponent or a mapping
+    (dict or Series) from group to exponent, keyed by tuples or a
+    MultiIndex for several columns, so the ``exponent`` column of
+    fit_learning_rates with the same ``group_cols`` can be passed as is;
+    groups missing from the mapping use DEFAULT_LEARNING_RATE. Returns
+    adjusted costs aligned to ``df.index``.
+    """
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    keys = [df[c] for c in group_cols]
+    cum = df[cum_col].astype("float64").replace(0, np.nan)
+    cum = cum.groupby(keys, sort=False, dropna=False, observed=True).bfill().fillna(1.0)
+    base = cum.groupby(keys, sort=False, dropna=False, observed=True).transform("first")
+    base = base.where(base > 0, 1.0)
+    if isinstance(learning_rate, (Mapping, pd.Series)):
+        groups = pd.MultiIndex.from_frame(df[group_cols]) if len(group_cols) > 1 else pd.Index(keys[0])
+        rate = pd.Series(learning_rate, dtype="float64").reindex(groups).to_numpy()
+        rate = pd.Series(rate, index=df.index).fillna(DEFAULT_LEARNING_RATE)
+    else:
+        rate = learning_rate
+    return df[cost_col] * (base / cum) ** rate
@@ -0,0 +1,70 @@
+"""
+Estimate learning rates from historical cost versus cumulative capacity.
+
+Fits log(cost) = a - b * log(cumulative_capacity) for every group (e.g.
+technology, or technology and region) at once: the per-group normal
+equations of the simple regression are built from grouped sums and solved
+together, so hundreds of curves need no Python loop. ``b`` is the exponent
+learning_curve takes; the learning rate per doubling of capacity is
+1 - 2 ** -b.
+"""
+
+from typing import Sequence, Union
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def fit_learning_rates(
+    df: pd.DataFrame,
+    group_cols: Union[str, Sequence[str]] = "technology",
+    cost_col: str = "capex",
+    cum_col: str = "cumulative_capacity",
+    confidence: float = 0.95
+) -> pd.DataFrame:
+    """
+    Least-squares learning exponents per group with t-based confidence intervals.
+
+    Rows with missing or non-positive cost or capacity are ignored. Returns
+    one row per group with ``n``, ``exponent`` (b) and its interval
+    ``exponent_low``/``exponent_high``, the matching ``learning_rate`` per
+    doubling with ``learning_rate_low``/``learning_rate_high``, and ``r2``.
+    Groups with fewer than three points or a single capacity value get NaN.
+    """
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    cost = df[cost_col].astype("float64")
+    cum = df[cum_col].astype("float64")
+    ok = (cost > 0) & (cum > 0)
+    data = pd.DataFrame({"x": np.log(cum[ok]), "y": np.log(cost[ok])})
+    keys = [df.loc[ok, c] for c in group_cols]
+    g = data.assign(xx=data["x"] ** 2, xy=data["x"] * data["y"], yy=data["y"] ** 2).groupby(keys, observed=True)
+    sums = g.sum()
+    n = g.size().astype("float64")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sxx = sums["xx"] - sums["x"] ** 2 / n
+        sxy = sums["xy"] - sums["x"] * sums["y"] / n
+        syy = sums["yy"] - sums["y"] ** 2 / n
+        slope = sxy / sxx
+        rss = (syy - slope * sxy).clip(lower=0)
+        dof = n - 2
+        se = np.sqrt(rss / dof / sxx)
+        r2 = 1 - rss / syy
+    valid = (dof > 0) & (sxx > 0)
+    t = stats.t.ppf(0.5 + confidence / 2, dof.where(valid))
+    exponent = (-slope).where(valid)
+    half = (t * se).where(valid)
+
+    def rate(b):
+        return 1 - 2.0 ** -b
+
+    return pd.DataFrame({
+        "n": n.astype(int),
+        "exponent": exponent,
+        "exponent_low": exponent - half,
+        "exponent_high": exponent + half,
+        "learning_rate": rate(exponent),
+        "learning_rate_low": rate(exponent - half),
+        "learning_rate_high": rate(exponent + half),
+        "r2": r2.where(valid),
+    })
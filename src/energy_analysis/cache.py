@@ -0,0 +1,101 @@
+"""
+Content-addressed on-disk cache for the expensive scenario outputs.
+
+Each entry is one result table (one scenario's projection_table rows, or a
+run_monte_carlo or sensitivity_table output) for one input table, stored as Parquet under
+``<data fingerprint>-<result key>.parquet``: the fingerprint hashes the
+input rows the computation reads, and the result key is taken over the
+computation's name and the canonical JSON of its parameters. Entries are
+touched on every hit and the least recently used are evicted once the
+directory grows past ``max_mb``. The cheap run_scenarios broadcast is not
+cached; hashing its input would cost more than computing it.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+import pandas as pd
+
+# Bump when the projection, Monte Carlo or sensitivity formulas change so stale entries are never read
+CACHE_VERSION = 1
+
+
+def frame_fingerprint(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> str:
+    """sha256 over the rows, column names and dtypes of ``df[columns]``, order-sensitive."""
+    df = df[list(columns)] if columns is not None else df
+    digest = hashlib.sha256(json.dumps({c: str(t) for c, t in df.dtypes.items()}).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def result_key(kind: str, params: Dict) -> str:
+    """sha256 of a computation's name and its parameters in canonical JSON."""
+    canonical = json.dumps({"version": CACHE_VERSION, "kind": kind, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def open_cache(cfg) -> Optional["ScenarioCache"]:
+    """The cache configured by the ``scenario_cache`` block of config.yaml, or None when disabled."""
+    opts = cfg.get("scenario_cache", {})
+    if not opts.get("enabled", True):
+        return None
+    return ScenarioCache(opts.get("dir", "data/cache/scenarios"), opts.get("max_mb", 256))
+
+
+class ScenarioCache:
+    """Parquet files in ``directory``, keyed by (data fingerprint, result key), LRU-evicted past ``max_mb``."""
+
+    def __init__(self, directory, max_mb: float = 256):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 2**20
+
+    def path(self, fingerprint: str, key: str) -> Path:
+        return self.directory / f"{fingerprint[:20]}-{key[:20]}.parquet"
+
+    def get(self, fingerprint: str, key: str) -> Optional[pd.DataFrame]:
+        path = self.path(fingerprint, key)
+        try:
+            df = pd.read_parquet(path)
+        except (FileNotFoundError, OSError):
+            return None
+        os.utime(path)  # mark as recently used
+        return df
+
+    def put(self, fingerprint: str, key: str, df: pd.DataFrame):
+        path = self.path(fingerprint, key)
+        tmp = path.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in ``max_mb``."""
+        entries = sorted(((p.stat().st_mtime, p.stat().st_size, p) for p in self.directory.glob("*.parquet")),
+                         key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def cached(cache: Optional[ScenarioCache], kind: str, df: pd.DataFrame, params: Dict,
+           compute: Callable[[], pd.DataFrame], columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    The stored result of ``kind`` with ``params`` on ``df[columns]``, or
+    ``compute()`` stored for next time; just ``compute()`` when ``cache`` is
+    None. ``params`` must hold everything ``compute`` depends on besides the
+    input rows.
+    """
+    if cache is None:
+        return compute()
+    fingerprint, key = frame_fingerprint(df, columns), result_key(kind, params)
+    out = cache.get(fingerprint, key)
+    if out is None:
+        out = compute()
+        cache.put(fingerprint, key, out)
+        cache.evict()
+    return out
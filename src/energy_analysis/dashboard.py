@@ -0,0 +1,144 @@
+"""
+Compact payloads for interactive Plotly dashboards.
+
+line_payload turns a long frame into a Plotly figure dict in which every
+trace is downsampled with Largest-Triangle-Three-Buckets (LTTB) to at most
+``max_points`` points, keeping the visual shape of the line, and every
+numeric array is embedded as a base64 typed array
+(``{"dtype": "f4", "bdata": ...}``) that plotly.js decodes straight into a
+TypedArray instead of parsing a JSON list of numbers (plotly.py 6 is the
+first release whose plotly.js decodes these, hence ``plotly>=6`` in the
+requirements). Pass the dict to ``plotly.io.show``/``plotly.io.to_html``
+with ``validate=False``, or write it with write_html.
+"""
+
+import base64
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the ``n_out`` points LTTB keeps from the series (x, y), which
+    must be sorted by x and free of NaN. The first and last points are
+    always kept; short series are returned whole. 2-D ``x`` and ``y`` hold
+    one series of equal length per row and are downsampled together,
+    returning one row of indices per series.
+    """
+    x2 = np.atleast_2d(np.asarray(x, dtype="float64"))
+    y2 = np.atleast_2d(np.asarray(y, dtype="float64"))
+    k, n = y2.shape
+    if n_out >= n or n_out < 3:
+        keep = np.broadcast_to(np.arange(n), (k, n))
+        return keep[0] if np.ndim(y) == 1 else keep
+    # n_out - 2 buckets between the fixed first and last points
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    keep = np.empty((k, n_out), dtype=np.int64)
+    keep[:, 0], keep[:, -1] = 0, n - 1
+    rows = np.arange(k)
+    a = np.zeros(k, dtype=np.int64)
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            cx, cy = x2[:, hi:edges[i + 2]].mean(axis=1), y2[:, hi:edges[i + 2]].mean(axis=1)
+        else:
+            cx, cy = x2[:, -1], y2[:, -1]
+        ax, ay = x2[rows, a][:, None], y2[rows, a][:, None]
+        # Twice the area of the triangle (previous pick, candidate, next bucket's centroid)
+        area = np.abs((ax - cx[:, None]) * (y2[:, lo:hi] - ay) - (ax - x2[:, lo:hi]) * (cy[:, None] - ay))
+        a = lo + np.argmax(area, axis=1)
+        keep[:, i + 1] = a
+    return keep[0] if np.ndim(y) == 1 else keep
+
+
+def typed_array(values, float32: bool = True):
+    """
+    Plotly typed-array dict for a numeric array: integers in the narrowest
+    of i1/i2/i4 that holds them, floats as f4 (or f8 with ``float32=False``).
+    Anything else (strings, datetimes) is returned as a plain list.
+    """
+    a = np.asarray(values)
+    if a.dtype.kind in "iu" and len(a):
+        lo, hi = a.min(), a.max()
+        code = next((c for c in ("i1", "i2", "i4") if np.iinfo(c).min <= lo and hi <= np.iinfo(c).max), "f8")
+    elif a.dtype.kind in "iub":
+        code = "i1"
+    elif a.dtype.kind == "f":
+        code = "f4" if float32 else "f8"
+    else:
+        return a.tolist()
+    data = np.ascontiguousarray(a, dtype="<" + code)
+    return {"dtype": code, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+
+
+def line_payload(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    color: Optional[str] = None,
+    line_group: Optional[str] = None,
+    max_points: int = 500,
+    title: Optional[str] = None,
+    float32: bool = True,
+    template: str = "plotly_white"
+) -> Dict:
+    """
+    Plotly figure dict with one line per ``color`` x ``line_group`` group,
+    like ``plotly.express.line``: lines of the same ``color`` share a colour
+    and a legend entry. Each line is sorted by ``x``, stripped of missing
+    ``y`` and LTTB-downsampled to ``max_points``.
+    """
+    import plotly.io as pio
+    from plotly.colors import qualitative
+
+    keys = [k for k in (color, line_group) if k]
+    data = df.loc[df[y].notna(), keys + [x, y]].sort_values(keys + [x], kind="stable")
+    sizes = data.groupby(keys, sort=True, observed=True).size() if keys else pd.Series([len(data)])
+    sizes = sizes[sizes > 0]
+    starts = np.r_[0, np.cumsum(sizes.to_numpy())[:-1]]
+    xs_all, ys_all = data[x].to_numpy(), data[y].to_numpy()
+
+    # Lines of equal length are downsampled together, one LTTB pass per length
+    picks = {}
+    for length in np.unique(sizes.to_numpy()):
+        which = np.flatnonzero(sizes.to_numpy() == length)
+        rows = starts[which][:, None] + np.arange(length)
+        keep = lttb(xs_all[rows].astype("float64"), ys_all[rows], max_points)
+        picks.update(zip(which, starts[which][:, None] + keep))
+
+    palette = qualitative.Plotly
+    colours, traces = {}, []
+    for i, key in enumerate(sizes.index):
+        key = key if isinstance(key, tuple) else (key,)
+        name = str(key[0]) if color else y
+        first = name not in colours
+        colours.setdefault(name, palette[len(colours) % len(palette)])
+        trace = {
+            "type": "scatter", "mode": "lines", "name": name, "legendgroup": name,
+            "showlegend": bool(color) and first, "line": {"color": colours[name]},
+            "x": typed_array(xs_all[picks[i]], float32), "y": typed_array(ys_all[picks[i]], float32),
+        }
+        if line_group:
+            trace["hovertemplate"] = f"{line_group}={key[-1]}<br>{x}=%{{x}}<br>{y}=%{{y}}<extra>{name}</extra>"
+        traces.append(trace)
+    # Templates are resolved on the Python side, so embed the template itself
+    layout = {"template": pio.templates[template].to_plotly_json(),
+              "xaxis": {"title": {"text": x}}, "yaxis": {"title": {"text": y}}}
+    if title:
+        layout["title"] = {"text": title}
+    if color:
+        layout["legend"] = {"title": {"text": color}}
+    return {"data": traces, "layout": layout}
+
+
+def write_html(payload: Dict, path, include_plotlyjs="cdn") -> Path:
+    """Standalone HTML page for a line_payload figure."""
+    import plotly.io as pio
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(pio.to_html(payload, include_plotlyjs=include_plotlyjs, validate=False), encoding="utf-8")
+    return path
@@ -1,27 +1,297 @@
+import hashlib, json, os, threading, time
 import yaml, requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+CHUNK_SIZE = 1 << 20  # 1 MiB
+MANIFEST_NAME = "manifest.json"
 
 def load_config():
     with open("config.yaml") as f:
         return yaml.safe_load(f)
 
-def download_source(name, url, outdir):
+def make_session(pool_size=10):
+    """Session with a connection pool shared by every configured source."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _expected_size(resp, offset):
+    # 206 responses carry the full size in "Content-Range: bytes a-b/total"
+    content_range = resp.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = resp.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return offset + int(length)
+    return None
+
+def _fetch_into(session, url, part, timeout, chunk_size, headers=None, seen=None):
+    """
+    Stream ``url`` into ``part``, resuming from its current size.
+
+    Returns ``(expected_size, response_headers)``, or ``None`` if a conditional
+    request was answered with 304 Not Modified. The response headers are also
+    copied into ``seen`` before streaming starts, so a caller can still read
+    the ETag when the connection drops mid-transfer.
+    """
+    offset = part.stat().st_size if part.exists() else 0
+    # Offsets and sizes count bytes on the wire, so ask for them uncompressed:
+    # iter_content would otherwise hand back gzip-decoded bytes
+    request_headers = {"Accept-Encoding": "identity", **(headers or {})}
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+    with session.get(url, stream=True, headers=request_headers, timeout=timeout) as resp:
+        if resp.status_code == 304:
+            return None
+        if offset and resp.status_code == 416:
+            # Nothing left to fetch if the partial file already holds every byte
+            expected = _expected_size(resp, offset)
+            if expected == offset:
+                return expected, resp.headers
+            part.unlink()
+            return _fetch_into(session, url, part, timeout, chunk_size, headers, seen)
+        resp.raise_for_status()
+        if offset and resp.status_code != 206:
+            print(f"↩️  Server ignored range request, restarting {part.name}")
+            offset = 0
+        expected = _expected_size(resp, offset)
+        if seen is not None:
+            seen.update(resp.headers)
+        with open(part, "ab" if offset else "wb") as fh:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                fh.write(chunk)
+    return expected, resp.headers
+
+def _is_retryable(exc):
+    """Connection drops, timeouts, 429 and 5xx; size and hash mismatches are final."""
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return status == 429 or (status is not None and status >= 500)
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout,
+                            requests.exceptions.ChunkedEncodingError))
+
+def download_source(name, url, outdir, session=None, sha256=None, size=None, previous=None,
+                    chunk_size=CHUNK_SIZE, timeout=60, attempts=3, limiter=None, backoff=0.0,
+                    on_attempt=None):
+    """
+    Stream ``url`` to ``outdir/<name>.csv`` and return its manifest entry.
+
+    Chunks are written to a ``.part`` file which is resumed with HTTP Range
+    requests if the connection drops, checked against the expected size (and
+    ``sha256`` when given), then atomically renamed into place.
+
+    ``previous`` is the source's entry from the last run's manifest. While the
+    file is still on disk its ETag / Last-Modified are sent as a conditional
+    GET, and ``None`` is returned if the server answers 304 Not Modified.
+
+    This is the only retry loop: each of the ``attempts`` requests first
+    waits on ``limiter`` (a HostRateLimiter), short reads resume right away,
+    retryable errors back off ``backoff * 2 ** (attempt - 1)`` seconds, and
+    oversized downloads or sha256 mismatches fail at once. ``on_attempt`` is
+    called with the attempt number before each request.
+    """
     out = Path(outdir) / f"{name}.csv"
-    if out.exists():
-        print(f"⏭ {out} exists, skipping")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    part = out.with_name(out.name + ".part")
+    session = session or make_session(1)
+    headers = {}
+    if previous and out.exists() and not part.exists():
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    print(f"{'🔎 Checking' if headers else '⬇️  Downloading'} {url}")
+    etag = last_modified = None
+    for attempt in range(1, attempts + 1):
+        if on_attempt is not None:
+            on_attempt(attempt)
+        if limiter is not None:
+            limiter.wait(url)
+        seen = {}
+        try:
+            result = _fetch_into(session, url, part, timeout, chunk_size, headers, seen)
+        except Exception as exc:
+            if attempt == attempts or not _is_retryable(exc):
+                raise
+            etag = seen.get("ETag", etag)
+            last_modified = seen.get("Last-Modified", last_modified)
+            if part.exists():
+                headers = {"If-Range": etag} if etag else {}
+            delay = backoff * 2 ** (attempt - 1)
+            print(f"🔁 {name}: {exc} (retry {attempt}/{attempts - 1} in {delay:.1f}s)")
+            time.sleep(delay)
+            continue
+        if result is None:
+            print(f"⏭ {out} not modified upstream, skipping")
+            return None
+        expected, resp_headers = result
+        etag = resp_headers.get("ETag", etag)
+        last_modified = resp_headers.get("Last-Modified", last_modified)
+        # Resumed requests must refer to the representation we started on
+        headers = {"If-Range": etag} if etag else {}
+        expected = size if size is not None else expected
+        got = part.stat().st_size
+        if expected is None or got == expected:
+            break
+        if got > expected:
+            part.unlink()
+            raise IOError(f"{name}: got {got} bytes, expected {expected}")
+        if attempt == attempts:
+            raise IOError(f"{name}: incomplete download ({got}/{expected} bytes)")
+        print(f"🔁 {name}: short read ({got}/{expected} bytes), resuming ({attempt}/{attempts})")
+    digest = file_sha256(part, chunk_size)
+    if sha256 is not None and digest != sha256.lower():
+        part.unlink()
+        raise ValueError(f"{name}: sha256 mismatch (got {digest}, expected {sha256})")
+    entry = {"url": url, "etag": etag, "last_modified": last_modified,
+             "size": part.stat().st_size, "sha256": digest,
+             "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    os.replace(part, out)
+    print(f"✅ Saved to {out}")
+    return entry
+
+def load_manifest(raw_dir):
+    """Return the ``{source name: entry}`` manifest kept in ``raw_dir``."""
+    path = Path(raw_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(raw_dir, manifest):
+    path = Path(raw_dir) / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def _stamp_contents(raw_dir, settings):
+    manifest = load_manifest(raw_dir)
+    return manifest, {"sources": {name: e["sha256"] for name, e in manifest.items()},
+                      "settings": settings}
+
+def inputs_changed(raw_dir, stamp, settings=None):
+    """
+    True if the raw data described by the manifest, or the downstream stage's
+    ``settings`` (any JSON-serialisable value), differ from what was recorded
+    in ``stamp`` by :func:`record_inputs`. Downstream stages use this to skip
+    reruns; without a manifest the answer is always True.
+    """
+    manifest, current = _stamp_contents(raw_dir, settings)
+    stamp = Path(stamp)
+    if not manifest or not stamp.exists():
+        return True
+    with open(stamp) as f:
+        seen = json.load(f)
+    # Round-trip through JSON so tuples and lists compare equal
+    return seen != json.loads(json.dumps(current))
+
+def record_inputs(raw_dir, stamp, settings=None):
+    """Record the current manifest hashes and ``settings`` in ``stamp`` after a downstream stage ran."""
+    _, current = _stamp_contents(raw_dir, settings)
+    with open(stamp, "w") as f:
+        json.dump(current, f, indent=2, sort_keys=True)
+
+class HostRateLimiter:
+    """Space out requests to the same host by at least ``min_interval`` seconds."""
+
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+def _ingest_one(src, outdir, session, limiter, retries, backoff, previous):
+    report = {"name": src["name"], "status": "unchanged", "attempts": 0,
+              "bytes": 0, "seconds": 0.0, "error": None, "entry": previous}
+    start = time.perf_counter()
+    try:
+        entry = download_source(src["name"], src["url"], outdir, session=session,
+                                sha256=src.get("sha256"), size=src.get("size"),
+                                previous=previous, attempts=retries, limiter=limiter,
+                                backoff=backoff, on_attempt=lambda n: report.update(attempts=n))
+    except Exception as exc:
+        report.update(status="failed", error=str(exc))
     else:
-        print(f"⬇️  Downloading {url}")
-        resp = requests.get(url)
-        resp.raise_for_status()
-        out.parent.mkdir(parents=True, exist_ok=True)
-        out.write_bytes(resp.content)
-        print(f"✅ Saved to {out}")
+        if entry is not None:
+            changed = previous is None or entry["sha256"] != previous.get("sha256")
+            report.update(status="downloaded" if changed else "unchanged", entry=entry)
+    if report["entry"] is not None:
+        report["bytes"] = report["entry"]["size"]
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+def ingest_sources(sources, outdir, max_workers=4, min_interval=0.0, retries=3, backoff=1.0):
+    """
+    Download ``sources`` concurrently on a bounded thread pool.
+
+    Sources already on disk are re-validated with conditional GETs against
+    the manifest in ``outdir`` and only fetched again when they changed.
+    Requests to the same host are spaced ``min_interval`` seconds apart and
+    retryable failures (connection errors, 429 and 5xx responses) are retried
+    with exponential backoff. The manifest is updated and one report dict per
+    source is returned, in config order.
+    """
+    manifest = load_manifest(outdir)
+    limiter = HostRateLimiter(min_interval)
+    workers = max(1, min(max_workers, len(sources)))
+    reports = {}
+    with make_session(workers) as session, ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(_ingest_one, src, outdir, session, limiter, retries, backoff,
+                               manifest.get(src["name"]))
+                   for src in sources]
+        for done, fut in enumerate(as_completed(futures), 1):
+            report = fut.result()
+            reports[report["name"]] = report
+            if report["entry"] is not None:
+                manifest[report["name"]] = report["entry"]
+            print(f"📦 [{done}/{len(sources)}] {report['name']}: {report['status']} "
+                  f"in {report['seconds']:.2f}s")
+    save_manifest(outdir, manifest)
+    return [reports[src["name"]] for src in sources]
+
+def print_report(reports):
+    print(f"{'source':<24}{'status':<12}{'attempts':>9}{'MB':>10}{'seconds':>10}")
+    for r in reports:
+        print(f"{r['name']:<24}{r['status']:<12}{r['attempts']:>9}"
+              f"{r['bytes'] / 1e6:>10.2f}{r['seconds']:>10.2f}")
 
 def main():
     cfg = load_config()
     raw = cfg["data"]["raw_dir"]
-    for src in cfg["data"]["sources"]:
-        download_source(src["name"], src["url"], raw)
+    opts = cfg["data"].get("ingest", {})
+    reports = ingest_sources(cfg["data"]["sources"], raw,
+                             max_workers=opts.get("max_workers", 4),
+                             min_interval=opts.get("min_interval", 0.0),
+                             retries=opts.get("retries", 3),
+                             backoff=opts.get("backoff", 1.0))
+    print_report(reports)
+    failed = [r for r in reports if r["status"] == "failed"]
+    if failed:
+        raise RuntimeError("Failed to download: " + ", ".join(f"{r['name']} ({r['error']})" for r in failed))
 
 if __name__ == "__main__":
     main()
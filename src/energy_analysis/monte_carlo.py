@@ -0,0 +1,187 @@
+"""
+Monte Carlo scenario sampling.
+
+Scenario parameters are drawn from the distributions declared under
+``monte_carlo.parameters`` in config.yaml and pushed through the projection
+kernel of :mod:`energy_analysis.scenario`, in batches spread across worker
+processes with independent SeedSequence streams.
+
+A draw's trajectory for a country is ``base * level * multiplier ** t``, t
+years after the country's last observation, so its log is
+``log(base) + log(level) + t * log(multiplier)``. Each batch therefore only
+histograms ``z_t = log(level) + t * log(multiplier)`` per horizon ``t``;
+the histograms are summed as batches finish and percentiles of every
+country-year follow as ``base * exp(quantile(z_t))``. No draw matrix beyond
+one batch is ever held in memory.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+import yaml
+import numpy as np
+import pandas as pd
+from energy_analysis.cache import cached, open_cache
+from energy_analysis.scenario import ELECTRIFICATION_SAVING, HORIZON, last_observed, log_growth
+from energy_analysis.storage import read_table, storage_options, write_table
+
+PARAMETERS = ["carbon_price", "gdp_growth", "population_growth",
+              "efficiency_improvement", "electrification_rate"]
+HIST_BINS = 4096
+PILOT_DRAWS = 20_000
+
+
+def load_config():
+    return yaml.safe_load(open("config.yaml"))
+
+
+def sample_parameters(spec: Dict, n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Draw ``n`` parameter sets from ``spec``, a mapping of parameter name to a
+    number (held fixed) or a distribution: ``{dist: uniform, low, high}``,
+    ``{dist: normal, mean, sd}``, ``{dist: lognormal, mean, sigma}`` (of the
+    underlying normal) or ``{dist: triangular, low, mode, high}``.
+    """
+    draws = {}
+    for name, d in spec.items():
+        if not isinstance(d, dict):
+            draws[name] = np.full(n, float(d))
+        elif d["dist"] == "uniform":
+            draws[name] = rng.uniform(d["low"], d["high"], n)
+        elif d["dist"] == "normal":
+            draws[name] = rng.normal(d["mean"], d["sd"], n)
+        elif d["dist"] == "lognormal":
+            draws[name] = rng.lognormal(d["mean"], d["sigma"], n)
+        elif d["dist"] == "triangular":
+            draws[name] = rng.triangular(d["low"], d["mode"], d["high"], n)
+        else:
+            raise ValueError(f"Unknown distribution '{d['dist']}' for parameter '{name}'")
+    missing = set(PARAMETERS) - set(draws)
+    if missing:
+        raise ValueError(f"No distribution given for parameters {sorted(missing)}")
+    return pd.DataFrame(draws)
+
+
+def _histogram_batch(spec, n, seed, steps, edges, electrification_saving):
+    """
+    Counts of one batch's ``z_t`` per step over ``edges``; column 0 and the
+    last column count draws below and above the edges.
+    """
+    rng = np.random.default_rng(seed)
+    z = log_growth(sample_parameters(spec, n, rng), steps, electrification_saving)
+    n_bins = edges.shape[1] + 1
+    bins = np.empty(z.shape, dtype=np.int64)
+    for j in range(len(steps)):
+        bins[:, j] = np.searchsorted(edges[j], z[:, j], side="right")
+    flat = bins + np.arange(len(steps)) * n_bins
+    return np.bincount(flat.ravel(), minlength=len(steps) * n_bins).reshape(len(steps), n_bins)
+
+
+def _quantiles(counts, edges, percentiles):
+    """(steps, percentiles) quantiles interpolated linearly inside the histogram bins."""
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1:]
+    out = np.empty((counts.shape[0], len(percentiles)))
+    rows = np.arange(counts.shape[0])
+    for k, p in enumerate(percentiles):
+        target = total[:, 0] * p / 100
+        idx = np.argmax(cum >= target[:, None], axis=1)
+        below = np.where(idx > 0, cum[rows, idx - 1], 0)
+        frac = np.clip((target - below) / np.maximum(counts[rows, idx], 1), 0, 1)
+        lo = edges[rows, np.clip(idx - 1, 0, edges.shape[1] - 1)]
+        hi = edges[rows, np.clip(idx, 0, edges.shape[1] - 1)]
+        out[:, k] = lo + frac * (hi - lo)
+    return out
+
+
+def run_monte_carlo(
+    df: pd.DataFrame,
+    spec: Dict,
+    draws: int = 200_000,
+    batch_size: int = 50_000,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    percentiles: Sequence[float] = (5, 50, 95),
+    horizon: int = HORIZON,
+    electrification_saving: float = ELECTRIFICATION_SAVING,
+    bins: int = HIST_BINS
+) -> pd.DataFrame:
+    """
+    Percentiles of projected consumption per country-year over ``draws``
+    parameter sets sampled from ``spec`` (see sample_parameters).
+
+    Draws are evaluated in batches of ``batch_size`` on ``workers``
+    processes (default: every core; 1 runs inline). Each batch gets its own
+    child of ``SeedSequence(seed)``, so results do not depend on the number
+    of workers. Histogram edges per horizon are set from a pilot sample with
+    a margin on both sides; quantiles are exact to within one of ``bins``.
+
+    Returns a long frame of country, year and one ``p<percentile>`` column
+    per requested percentile.
+    """
+    countries, base_year, base = last_observed(df)
+    start = min(int(base_year.min()), horizon) if len(base_year) else horizon
+    steps = np.arange(1, horizon - start + 1)
+    n_batches = -(-draws // batch_size)
+    pilot_seed, *batch_seeds = np.random.SeedSequence(seed).spawn(n_batches + 1)
+
+    pilot = log_growth(sample_parameters(spec, PILOT_DRAWS, np.random.default_rng(pilot_seed)),
+                      steps, electrification_saving)
+    lo, hi = np.nanmin(pilot, axis=0), np.nanmax(pilot, axis=0)
+    margin = np.maximum(hi - lo, 1e-9) * 0.5
+    edges = np.linspace(lo - margin, hi + margin, bins + 1, axis=1)
+
+    sizes = [min(batch_size, draws - i * batch_size) for i in range(n_batches)]
+    args = [(spec, n, s, steps, edges, electrification_saving) for n, s in zip(sizes, batch_seeds)]
+    counts = np.zeros((len(steps), bins + 2), dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for a in args:
+            counts += _histogram_batch(*a)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for c in pool.map(_histogram_batch, *zip(*args)):
+                counts += c
+    q = _quantiles(counts, edges, percentiles)
+
+    years = np.arange(start + 1, horizon + 1)
+    c, y = np.nonzero(years[None, :] > base_year[:, None])
+    t = years[y] - base_year[c]
+    out = pd.DataFrame({
+        "country": pd.Categorical.from_codes(c, categories=pd.Index(countries)),
+        "year": years[y].astype("int16"),
+    })
+    for k, p in enumerate(percentiles):
+        out[f"p{p:g}"] = base[c] * np.exp(q[t - 1, k])
+    return out
+
+
+def cached_run(cfg: Dict, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    run_monte_carlo with the ``monte_carlo`` and ``projection`` settings of
+    config.yaml, through the scenario cache. The worker count is not part of
+    the key, since results do not depend on it.
+    """
+    opts = dict(cfg.get("monte_carlo", {}))
+    spec = opts.pop("parameters")
+    params = {**opts, **cfg.get("projection", {})}
+    key = {k: v for k, v in params.items() if k != "workers"}
+    return cached(open_cache(cfg), "run_monte_carlo", df, {"parameters": spec, **key},
+                  lambda: run_monte_carlo(df, spec, **params),
+                  columns=["country", "year", "primary_energy_consumption"])
+
+
+def main():
+    cfg = load_config()
+    proc = cfg["data"]["processed_dir"]
+    df = read_table(Path(proc)/"sample_energy", columns=["country", "year", "primary_energy_consumption"])
+    out = cached_run(cfg, df)
+    path = write_table(out, Path(proc)/"scenario_monte_carlo", **storage_options(cfg))
+    draws = cfg.get("monte_carlo", {}).get("draws", 200_000)
+    print(f"🎲 {draws:,} draws -> percentiles for {out['country'].nunique()} countries")
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
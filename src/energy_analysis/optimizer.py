@@ -0,0 +1,158 @@
+"""
+Inverse scenario mode: solve for the scenario parameters that put each
+country on a target consumption pathway.
+
+A target is a mapping of year to relative change in consumption, e.g.
+``{2040: -0.2}`` for 20% lower consumption in 2040, or a frame of country,
+year and change for per-country goals, measured against the
+country's last observation (``relative_to="base"``) or against the
+unmodified scenario's own projection (``relative_to="scenario"``). The free
+parameters are searched within their bounds while the rest of the scenario
+is held fixed; the objective is the mean squared log error over the target
+years, minimised by golden-section search along one parameter at a time
+(cyclic coordinate search). Every country is solved at once: each step
+evaluates the projection kernel for the whole country vector.
+"""
+
+from pathlib import Path
+from typing import Dict, Sequence, Tuple, Union
+import yaml
+import numpy as np
+import pandas as pd
+from energy_analysis.scenario import ELECTRIFICATION_SAVING, last_observed, log_growth
+from energy_analysis.storage import read_table, storage_options, write_table
+
+GOLDEN = (np.sqrt(5) - 1) / 2
+
+
+def load_config():
+    return yaml.safe_load(open("config.yaml"))
+
+
+class PathwayObjective:
+    """Mean squared log error of every country's projection against its target, for (countries, k) parameters."""
+
+    def __init__(self, df, scenario: Dict, free: Sequence[str], targets: Union[Dict[int, float], pd.DataFrame],
+                 relative_to: str = "base", electrification_saving: float = ELECTRIFICATION_SAVING):
+        self.countries, base_year, base = last_observed(df)
+        if isinstance(targets, pd.DataFrame):
+            goal = targets.pivot_table(index="country", columns="year", values="change", observed=True)
+            goal = goal.reindex(index=self.countries)
+        else:
+            goal = pd.DataFrame([targets] * len(self.countries), index=self.countries)
+        self.years = np.array(sorted(goal.columns), dtype=np.int64)
+        self.steps = self.years[None, :].astype("float64") - base_year[:, None]
+        self.free = list(free)
+        self.fixed = {k: float(v) for k, v in scenario.items() if k != "name" and k not in self.free}
+        self.electrification_saving = electrification_saving
+        self.reference = np.zeros(self.steps.shape)
+        if relative_to == "scenario":
+            own = np.array([[float(scenario[k]) for k in self.free]] * len(self.countries))
+            self.reference = self.log_change(own)
+        elif relative_to != "base":
+            raise ValueError(f"relative_to must be 'base' or 'scenario', got '{relative_to}'")
+        # Countries without a target for a year are left out of that year's error
+        self.goal = np.log1p(goal[list(self.years)].to_numpy(dtype="float64")) + self.reference
+
+    def log_change(self, x: np.ndarray) -> np.ndarray:
+        """(countries, target years) log of projected consumption relative to each country's base."""
+        params = pd.DataFrame(x, columns=self.free).assign(**self.fixed)
+        return log_growth(params, self.steps, self.electrification_saving)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        err = (self.log_change(x) - self.goal) ** 2
+        return np.where(np.isnan(err), 0, err).sum(axis=1) / np.maximum((~np.isnan(err)).sum(axis=1), 1)
+
+
+def _golden_section(objective, x, j, lo, hi, tol, max_iter):
+    """Minimise ``objective`` along coordinate ``j`` of every row of ``x`` within [lo, hi] at once."""
+    a, b = np.full(len(x), lo, dtype="float64"), np.full(len(x), hi, dtype="float64")
+
+    def at(v):
+        trial = x.copy()
+        trial[:, j] = v
+        return objective(trial)
+
+    c, d = b - GOLDEN * (b - a), a + GOLDEN * (b - a)
+    fc, fd = at(c), at(d)
+    for _ in range(max_iter):
+        if np.all(b - a < tol):
+            break
+        left = fc < fd
+        # Minimum in [a, d] where f(c) < f(d), else in [c, b]; the kept interior
+        # point is reused, so each step costs one evaluation per country
+        b, a = np.where(left, d, b), np.where(left, a, c)
+        point = np.where(left, b - GOLDEN * (b - a), a + GOLDEN * (b - a))
+        f_point = at(point)
+        c, d = np.where(left, point, d), np.where(left, c, point)
+        fc, fd = np.where(left, f_point, fd), np.where(left, fc, f_point)
+    best = (a + b) / 2
+    x = x.copy()
+    x[:, j] = best
+    return x
+
+
+def solve_pathways(
+    df: pd.DataFrame,
+    scenario: Dict,
+    targets: Union[Dict[int, float], pd.DataFrame],
+    bounds: Dict[str, Tuple[float, float]],
+    relative_to: str = "base",
+    tol: float = 1e-6,
+    max_sweeps: int = 20,
+    max_iter: int = 200,
+    electrification_saving: float = ELECTRIFICATION_SAVING
+) -> pd.DataFrame:
+    """
+    Per country, the values of the parameters in ``bounds`` that bring
+    projected consumption closest to ``targets`` (see the module docstring),
+    with the other parameters taken from ``scenario``.
+
+    Returns one row per country with the solved parameters, the achieved
+    change for each target year (against the same reference as the target)
+    and ``attained``, which is False where the target lies outside what the
+    bounds and the constant-rate projection allow.
+    """
+    objective = PathwayObjective(df, scenario, list(bounds), targets, relative_to, electrification_saving)
+    free = list(bounds)
+    x = np.array([[float(scenario.get(k, np.mean(bounds[k]))) for k in free]] * len(objective.countries))
+    x = np.clip(x, [b[0] for b in bounds.values()], [b[1] for b in bounds.values()])
+    loss = objective(x)
+    for _ in range(max_sweeps):
+        for j, name in enumerate(free):
+            lo, hi = bounds[name]
+            x = _golden_section(objective, x, j, lo, hi, tol * (hi - lo), max_iter)
+        new_loss = objective(x)
+        converged = np.all(loss - new_loss <= 1e-12)
+        loss = new_loss
+        if converged:
+            break
+
+    out = pd.DataFrame(x, columns=free)
+    out.insert(0, "country", objective.countries)
+    change = np.expm1(objective.log_change(x) - objective.reference)
+    for i, year in enumerate(objective.years):
+        out[f"change_{year}"] = change[:, i]
+    out["rmse_log"] = np.sqrt(loss)
+    out["attained"] = out["rmse_log"] < 1e-3
+    return out
+
+
+def main():
+    cfg = load_config()
+    proc = cfg["data"]["processed_dir"]
+    opts = cfg["optimizer"]
+    scenario = next(s for s in cfg["scenarios"] if s["name"] == opts["scenario"])
+    bounds = {k: tuple(v) for k, v in opts["bounds"].items()}
+    targets = {int(k): float(v) for k, v in opts["targets"].items()}
+    df = read_table(Path(proc)/"sample_energy", columns=["country", "year", "primary_energy_consumption"])
+    saving = cfg.get("projection", {}).get("electrification_saving", ELECTRIFICATION_SAVING)
+    out = solve_pathways(df, scenario, targets, bounds, opts.get("relative_to", "base"),
+                         electrification_saving=saving)
+    path = write_table(out, Path(proc)/"scenario_targets", **storage_options(cfg))
+    print(f"🎯 {out['attained'].sum()} of {len(out)} countries can reach {targets} within {bounds}")
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
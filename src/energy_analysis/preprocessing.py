@@ -1,39 +1,493 @@
+import json, os, tempfile
 import yaml, pandas as pd, numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from energy_analysis.data_ingest import inputs_changed, record_inputs
+from energy_analysis.outliers import detect_outliers, score_outliers
+from energy_analysis.storage import TableWriter, read_table, storage_options, write_table
+
+INPUTS_STAMP = "raw_inputs.json"
+PARTITIONS_SUFFIX = "_partitions.json"
+KEY_DTYPES = {"country": "category", "iso_code": "category", "year": "int16"}
+# float32 resolves whole units only below 2**24; larger magnitudes stay float64
+FLOAT32_EXACT_LIMIT = 2 ** 24
+SCHEMA_SAMPLE_ROWS = 10_000
+DEFAULT_OUTLIERS = {"columns": ["primary_energy_consumption"], "by": "country",
+                    "method": "rolling", "threshold": 3.5, "window": 15}
+ARROW_TYPES = {
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "int16": pa.int16(),
+    "float32": pa.float32(),
+    "float64": pa.float64(),
+}
 
 def load_config():
     with open("config.yaml") as f:
         return yaml.safe_load(f)
 
-def drop_outliers(df, column, z_thresh=4.0):
-    z = (df[column] - df[column].mean()) / df[column].std()
-    return df[abs(z) <= z_thresh]
+def infer_schema(csv, sample_rows=SCHEMA_SAMPLE_ROWS):
+    """
+    Dtype for every column of ``csv``, from its header and a leading sample.
+
+    Keys use KEY_DTYPES and other text columns become categorical. Numeric
+    indicators are float32 unless the sample reaches magnitudes float32 cannot
+    resolve to whole units (population, GDP), which stay float64.
+    """
+    sample = pd.read_csv(csv, nrows=sample_rows)
+    schema = {}
+    for col in sample.columns:
+        if col in KEY_DTYPES:
+            schema[col] = KEY_DTYPES[col]
+        elif not pd.api.types.is_numeric_dtype(sample[col]):
+            schema[col] = "category"
+        else:
+            schema[col] = "float64" if (sample[col].abs() >= FLOAT32_EXACT_LIMIT).any() else "float32"
+    return schema
+
+def read_raw(csv, schema=None):
+    """
+    Read a raw CSV in a single typed pass.
+
+    Values are parsed straight into their ``infer_schema`` dtypes and columns
+    that are entirely empty are dropped before the data reaches pandas.
+    """
+    schema = schema or infer_schema(csv)
+    table = pacsv.read_csv(csv, convert_options=_convert_options(schema))
+    keep = [name for name, col in zip(table.column_names, table.columns) if col.null_count < len(col)]
+    df = table.select(keep).to_pandas(self_destruct=True)
+    for col in df.select_dtypes("category").columns:
+        # Arrow dictionaries are in order of appearance; sort so sort_values stays lexical
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+def _convert_options(schema):
+    return pacsv.ConvertOptions(
+        column_types={col: ARROW_TYPES[dtype] for col, dtype in schema.items()},
+        strings_can_be_null=True)
+
+def iter_raw_chunks(csv, schema=None, chunk_mb=64):
+    """Stream a raw CSV as typed DataFrames of roughly ``chunk_mb`` of input each."""
+    schema = schema or infer_schema(csv)
+    reader = pacsv.open_csv(csv, read_options=pacsv.ReadOptions(block_size=int(chunk_mb * 2**20)),
+                            convert_options=_convert_options(schema))
+    for batch in reader:
+        yield batch.to_pandas()
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+def drop_outliers(df, outliers=None):
+    """
+    Drop rows flagged by :func:`energy_analysis.outliers.detect_outliers`.
+
+    ``outliers`` overrides keys of DEFAULT_OUTLIERS. Returns the kept rows
+    and the audit table of what was removed.
+    """
+    opts = {**DEFAULT_OUTLIERS, **(outliers or {})}
+    mask, audit = detect_outliers(df, **opts)
+    return df[~mask.to_numpy()], audit
 
 def compute_per_capita(df, pop_col, val_col):
     if pop_col in df.columns:
         df["energy_per_capita"] = df[val_col] / df[pop_col]
     return df
 
-def clean_df(df):
-    df = df.dropna(axis=1, how="all").drop_duplicates()
-    df["year"] = df["year"].astype(int)
-    df = drop_outliers(df, "primary_energy_consumption")
-    df = df.sort_values(["country","year"]).groupby("country").apply(lambda g: g.ffill().bfill()).reset_index(drop=True)
-    df = compute_per_capita(df, "population", "primary_energy_consumption")
-    return df
+def _segmented_fill_index(valid, starts):
+    """
+    Flat index to take each value from after a per-group ffill + bfill.
+
+    ``valid`` is a C-contiguous (k, n) mask of non-missing values, one row per
+    column, and ``starts`` flags the first element of each contiguous group.
+    The returned (k, n) indices address ``array.ravel()`` of a (k, n) array.
+    """
+    k, n = valid.shape
+    itype = np.int32 if valid.size < 2**31 else np.int64
+    # Forward fill: running max of valid positions, reset at every group start
+    fwd = np.multiply(valid | starts, np.arange(n, dtype=itype), dtype=itype)
+    np.maximum.accumulate(fwd, axis=1, out=fwd)
+    fwd += (np.arange(k, dtype=itype) * n)[:, None]
+    flat = fwd.ravel()
+    # What is still missing is each group's leading gap; back fill it from
+    # the first row after the gap, if that row is in the same group
+    lead = np.flatnonzero(~valid.ravel()[flat])
+    if lead.size:
+        row = lead % n
+        new_run = np.ones(lead.size, dtype=bool)
+        new_run[1:] = (np.diff(lead) != 1) | starts[row[1:]]
+        run_start = np.flatnonzero(new_run)
+        run_end = np.append(run_start[1:], lead.size) - 1
+        after = row[run_end] + 1
+        ok = after < n
+        ok[ok] = ~starts[after[ok]]
+        target = np.repeat(np.where(ok, lead[run_end] + 1, -1), np.diff(np.append(run_start, lead.size)))
+        keep = target >= 0
+        flat[lead[keep]] = target[keep]
+    return fwd
+
+def fill_gaps(df, by="country"):
+    """
+    Forward- then back-fill every column within each ``by`` group.
+
+    Vectorized equivalent of ``groupby(by).apply(lambda g: g.ffill().bfill())``
+    on a frame sorted by ``by``: rows with a missing key are dropped, as
+    groupby does, and the result has a fresh RangeIndex.
+    """
+    if df[by].isna().any():
+        df = df[df[by].notna()]
+    keys = df[by].cat.codes.to_numpy() if isinstance(df[by].dtype, pd.CategoricalDtype) else df[by].to_numpy()
+    starts = np.ones(len(df), dtype=bool)
+    starts[1:] = keys[1:] != keys[:-1]
+    cols = df.columns.drop(by)
+    dtypes = df.dtypes[cols]
+    filled = {by: df[by].array}
+    for dtype in dtypes.unique():
+        names = cols[(dtypes == dtype).to_numpy()]
+        if isinstance(dtype, np.dtype) and dtype.kind == "f":
+            # All float columns are filled as one (k, n) block
+            block = np.ascontiguousarray(df[names].to_numpy().T)
+            idx = _segmented_fill_index(~np.isnan(block), starts)
+            filled.update(zip(names, block.ravel()[idx]))
+            continue
+        for col in names:
+            values = df[col].array
+            valid = ~np.asarray(pd.isna(values))
+            if valid.all():
+                filled[col] = values
+            else:
+                filled[col] = values.take(_segmented_fill_index(valid[None, :], starts)[0])
+    return pd.DataFrame({col: filled[col] for col in df.columns})
+
+def _prepare(df, outliers=None, columns=None):
+    """
+    Whole-frame steps of clean_df: empty columns, duplicates, sort, outliers.
+    ``columns`` fixes the kept columns, for a subset of a frame whose empty
+    columns were decided on the whole.
+    """
+    df = (df[columns] if columns is not None else df.dropna(axis=1, how="all")).drop_duplicates()
+    if not pd.api.types.is_integer_dtype(df["year"]):
+        df["year"] = df["year"].astype(int)
+    return drop_outliers(df.sort_values(["country","year"]), outliers)
+
+def _finish(df):
+    """Per-country steps of clean_df, safe to run on any slice of whole countries."""
+    df = fill_gaps(df, "country")
+    return compute_per_capita(df, "population", "primary_energy_consumption")
+
+def clean_df(df, outliers=None, return_audit=False):
+    """
+    Clean a raw frame. ``outliers`` configures the outlier engine (see
+    drop_outliers); with ``return_audit`` the audit of removed values is
+    returned alongside the cleaned frame.
+    """
+    df, audit = _prepare(df, outliers)
+    df = _finish(df)
+    return (df, audit) if return_audit else df
+
+def country_shards(df, n_shards, by="country"):
+    """Split a frame sorted by ``by`` into at most ``n_shards`` contiguous slices of whole groups."""
+    keys = df[by].cat.codes.to_numpy() if isinstance(df[by].dtype, pd.CategoricalDtype) else df[by].to_numpy()
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(df) else np.zeros(1, dtype=int)
+    targets = np.linspace(0, len(df), n_shards + 1)[1:-1]
+    cuts = np.unique(starts[np.minimum(np.searchsorted(starts, targets), len(starts) - 1)])
+    cuts = cuts[(cuts > 0) & (cuts < len(df))]
+    return [df.iloc[lo:hi] for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(df)])]
+
+def _clean_shard(df, outliers=None, columns=None):
+    """clean_df with audit on a slice of whole countries, ``columns`` decided on the whole frame."""
+    df, audit = _prepare(df, outliers, columns)
+    return _finish(df), audit
+
+def _clean_sharded(df, pool, n_shards, outliers=None, columns=None):
+    """
+    Split the raw frame into shards of whole countries and clean them on
+    ``pool``. Duplicate rows always share a country and per-country
+    outliers only see their own country, so every step runs in the workers;
+    outliers against the whole frame (``by`` other than country) are
+    dropped here first.
+    """
+    if {**DEFAULT_OUTLIERS, **(outliers or {})}["by"] != "country":
+        prepared, audit = _prepare(df, outliers, columns)
+        return pd.concat(pool.map(_finish, country_shards(prepared, n_shards)), ignore_index=True), audit
+    # A stable sort keeps the raw order within each country, which drop_duplicates relies on
+    shards = country_shards(df.sort_values("country", kind="stable"), n_shards)
+    cleaned, audits = zip(*pool.map(partial(_clean_shard, outliers=outliers, columns=columns), shards))
+    return pd.concat(cleaned, ignore_index=True), pd.concat(audits, ignore_index=True)
+
+def clean_df_parallel(df, pool, n_shards, outliers=None, return_audit=False):
+    """
+    clean_df with the work fanned out over ``pool``.
+
+    Only the choice of empty columns is made on the whole frame; the raw
+    rows are cut into shards of whole countries, each cleaned in a worker,
+    and the results concatenated in country order, so the output (and
+    audit) is identical to clean_df.
+    """
+    columns = df.columns[df.notna().any().to_numpy()]
+    df, audit = _clean_sharded(df, pool, n_shards, outliers, columns)
+    return (df, audit) if return_audit else df
+
+def partition_fingerprints(df, by="country", block_years=10):
+    """
+    Fingerprint the raw rows of every (``by``, year-block) partition.
+
+    Each fingerprint is the wrapping uint64 sum of the partition's row
+    hashes, so it does not depend on row order. Returns a dict keyed
+    ``"<group>|<first year of block>"`` with hex digests, ready for JSON.
+    """
+    hashes = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    block = (df["year"].to_numpy() // block_years) * block_years
+    sums = hashes.groupby([df[by].to_numpy(), block], dropna=False).sum()
+    return {f"{group}|{start}": f"{value:016x}" for (group, start), value in sums.items()}
+
+def changed_groups(current, previous):
+    """Groups with a partition added, removed or changed between two partition_fingerprints."""
+    keys = set(current) ^ set(previous) | {k for k in current.keys() & previous.keys() if current[k] != previous[k]}
+    return {key.rsplit("|", 1)[0] for key in keys}
+
+def _patch(old, new, groups, categories, by="country"):
+    """Replace ``groups`` of the ``by``-sorted ``old`` with ``new`` and keep the order by ``by``."""
+    old = old[~old[by].astype(str).isin(groups)].copy()
+    for col, dtype in categories.items():
+        for part in (old, new):
+            if col in part.columns:
+                part[col] = part[col].astype("category").cat.set_categories(dtype.categories)
+    out = pd.concat([old, new], ignore_index=True)
+    return out.sort_values(by, kind="stable").reset_index(drop=True)
+
+def clean_incremental(df, groups, previous, previous_audit, outliers=None, pool=None, n_shards=1):
+    """
+    Reclean only the countries in ``groups`` and patch them into ``previous``,
+    the stored clean_df output for an earlier version of ``df``.
+
+    Every cleaning step after the choice of empty columns is per country, so
+    the result equals ``clean_df(df, outliers, return_audit=True)``.
+    ``previous_audit`` is patched the same way, its raw row numbers remapped
+    to the current file by (country, year).
+    """
+    columns = df.columns[df.notna().any().to_numpy()]
+    changed = df[df["country"].astype(str).isin(groups)]
+    if pool is None:
+        cleaned, audit = _clean_shard(changed, outliers, columns)
+    else:
+        cleaned, audit = _clean_sharded(changed, pool, n_shards, outliers, columns)
+    categories = {col: df[col].dtype for col in columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+    kept = previous_audit[~previous_audit["country"].astype(str).isin(groups)].copy()
+    if len(kept):
+        first = df.index.to_series(index=pd.MultiIndex.from_frame(df[["country", "year"]].astype({"country": str})))
+        first = first[~first.index.duplicated()]
+        keys = pd.MultiIndex.from_frame(kept[["country", "year"]].astype({"country": str, "year": df["year"].dtype}))
+        kept["row"] = first.reindex(keys).to_numpy()
+    audit = pd.concat([kept, audit], ignore_index=True)
+    audit = audit.sort_values("country", kind="stable", key=lambda c: c.astype(str)).reset_index(drop=True)
+    return _patch(previous, cleaned, groups, categories), audit
+
+def _welford_update(state, values):
+    """Fold a chunk into running (count, mean, M2), merging chunk moments with Chan's update."""
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return state
+    n_a, mean_a, m2_a = state
+    n_b, mean_b = values.size, values.mean()
+    m2_b = ((values - mean_b) ** 2).sum()
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+def _first_occurrences(hashes, seen):
+    """Mask of rows whose hash is new within the chunk and absent from sorted ``seen``."""
+    keep = np.zeros(hashes.size, dtype=bool)
+    keep[np.unique(hashes, return_index=True)[1]] = True
+    if seen.size:
+        pos = np.minimum(np.searchsorted(seen, hashes), seen.size - 1)
+        keep &= seen[pos] != hashes
+    return keep
+
+def clean_csv_chunked(csv, out, chunk_mb=64, outliers=None, fmt="parquet", export_csv=False):
+    """
+    Out-of-core equivalent of ``clean_df(read_raw(csv), outliers, return_audit=True)``
+    for files larger than RAM. Returns the path written and the outlier audit.
+
+    Pass 1 streams the file to find the columns that are entirely empty and
+    mark duplicate rows by row hash (plus, for a global z-score, the outlier
+    mean/variance with Welford's algorithm). Pass 2 streams it again, drops
+    duplicates and spills each chunk to disk sorted by country. The
+    per-country partitions are then outlier-screened and gap-filled in
+    batches of whole countries, about one chunk in size, and appended to
+    ``out``.
+    """
+    opts = {**DEFAULT_OUTLIERS, **(outliers or {})}
+    columns = [opts["columns"]] if isinstance(opts["columns"], str) else list(opts["columns"])
+    # Grouped methods only need one country at a time; a global z-score needs
+    # whole-file moments, so it is accumulated in pass 1
+    global_z = opts["by"] is None
+    if global_z and opts["method"] != "zscore":
+        raise ValueError(f"Out-of-core outlier method '{opts['method']}' needs by=<group column>")
+    schema = infer_schema(csv)
+    non_null = pd.Series(0, index=list(schema))
+    seen = np.empty(0, dtype=np.uint64)
+    stats = {col: (0, 0.0, 0.0) for col in columns}
+    keep_masks = []
+    categories = {col: set() for col, dtype in schema.items() if dtype == "category"}
+    for chunk in iter_raw_chunks(csv, schema, chunk_mb):
+        non_null += chunk.notna().sum()
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        keep = _first_occurrences(hashes, seen)
+        seen = np.sort(np.concatenate([seen, hashes[keep]]), kind="stable")
+        if global_z:
+            for col in columns:
+                stats[col] = _welford_update(stats[col], chunk.loc[keep, col].to_numpy(dtype="float64"))
+        for col, values in categories.items():
+            values.update(chunk[col].dropna().unique())
+        keep_masks.append(np.packbits(keep))
+    del seen
+    mean = pd.Series({col: s[1] for col, s in stats.items()})
+    std = pd.Series({col: np.sqrt(s[2] / (s[0] - 1)) if s[0] > 1 else np.nan for col, s in stats.items()})
+    cols = [c for c in schema if non_null[c] > 0]
+    categories = {col: pd.CategoricalDtype(sorted(values)) for col, values in categories.items() if col in cols}
+    countries = categories["country"].categories
+
+    audits = []
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Path(out).parent) as spill:
+        # Each chunk is spilled once, sorted by country, as a memory-mappable
+        # Arrow file; bounds[i][c]:bounds[i][c + 1] are country c's rows in chunk i.
+        # "_row" carries the raw file row so audits match the in-memory path
+        spill, bounds, offset = Path(spill), [], 0
+        for i, chunk in enumerate(iter_raw_chunks(csv, schema, chunk_mb)):
+            keep = np.unpackbits(keep_masks[i], count=len(chunk)).astype(bool)
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            chunk = chunk.loc[keep, cols]
+            if not pd.api.types.is_integer_dtype(chunk["year"]):
+                chunk["year"] = chunk["year"].astype(int)
+            for col, dtype in categories.items():
+                # set_categories, not astype: unordered dtypes compare equal in any order
+                chunk[col] = chunk[col].cat.set_categories(dtype.categories)
+            if global_z:
+                mask, audit = score_outliers(chunk, columns, mean, std, opts["threshold"], by="country")
+                audits.append(audit)
+                chunk = chunk[~mask.to_numpy()]
+            chunk = chunk[chunk["country"].notna()]
+            codes = chunk["country"].cat.codes.to_numpy(dtype=np.int64)
+            order = np.argsort(codes, kind="stable")
+            bounds.append(np.searchsorted(codes[order], np.arange(len(countries) + 1)))
+            table = pa.Table.from_pandas(chunk.iloc[order].rename_axis("_row").reset_index())
+            with pa.ipc.new_file(str(spill / f"{i:06d}.arrow"), table.schema) as w:
+                w.write_table(table)
+        batches = [pa.ipc.open_file(pa.memory_map(str(spill / f"{i:06d}.arrow"))).read_all()
+                   for i in range(len(bounds))]
+        # Screen and fill whole countries in batches of about one chunk's worth of rows
+        rows = np.sum([np.diff(b) for b in bounds], axis=0)
+        budget = max(int(max((b[-1] for b in bounds), default=0)), 1)
+        cuts = np.unique(np.searchsorted(np.cumsum(rows), np.arange(budget, rows.sum(), budget), side="right"))
+        with TableWriter(out, fmt, export_csv) as writer:
+            for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(countries)]):
+                parts = [t.slice(b[lo], b[hi] - b[lo]) for t, b in zip(batches, bounds) if b[hi] > b[lo]]
+                if not parts:
+                    continue
+                df = pa.concat_tables(parts).to_pandas().set_index("_row").rename_axis(None)
+                df = df.sort_values(["country", "year"], kind="stable")
+                if not global_z:
+                    df, audit = drop_outliers(df, opts)
+                    audits.append(audit)
+                df = fill_gaps(df, "country")
+                writer.write(compute_per_capita(df, "population", "primary_energy_consumption"))
+        del batches
+    audit = pd.concat(audits, ignore_index=True)
+    if global_z:
+        # In memory the frame is scored after sorting by country and year
+        audit = audit.sort_values(["country", "year", "row"], kind="stable")
+        audit = audit.drop(columns="country").reset_index(drop=True)
+    return writer.path, audit
+
+def _clean_file(csv, procdir, chunk_mb, storage, outliers=None, block_years=None, pool=None, n_shards=1):
+    """
+    Clean one raw file into ``procdir``, with its outlier audit beside it, and return a log line.
+
+    With ``block_years``, in-memory files are fingerprinted per (country,
+    year-block) and, when the previous run's settings still apply, only
+    countries with a changed partition are recleaned and patched in.
+    """
+    audit_path = procdir / f"{csv.stem}_outliers"
+    if chunk_mb and csv.stat().st_size > chunk_mb * 2**20:
+        out, audit = clean_csv_chunked(csv, procdir / csv.stem, chunk_mb, outliers, **storage)
+        log = f"📝 Wrote cleaned data to {out} (out-of-core, {chunk_mb} MB chunks)"
+    else:
+        df = read_raw(csv)
+        opts = {**DEFAULT_OUTLIERS, **(outliers or {})}
+        state_path = procdir / f"{csv.stem}{PARTITIONS_SUFFIX}"
+        state = {"block_years": block_years, "schema": {col: str(t) for col, t in df.dtypes.items()},
+                 "outliers": opts, "storage": storage}
+        previous = json.loads(state_path.read_text()) if state_path.exists() else {}
+        groups = None
+        if block_years and opts["by"] == "country":
+            state["partitions"] = partition_fingerprints(df, "country", block_years)
+            if previous and all(previous.get(k) == v for k, v in state.items() if k != "partitions"):
+                groups = changed_groups(state["partitions"], previous["partitions"])
+        previous_tables = None
+        if groups is not None:
+            try:
+                previous_tables = (read_table(procdir / csv.stem), read_table(audit_path))
+            except FileNotFoundError:
+                pass
+        if previous_tables is not None and not groups:
+            return f"⏭ {csv.name}: no country changed since the last run"
+        if previous_tables is not None:
+            df_clean, audit = clean_incremental(df, groups, *previous_tables, outliers, pool, n_shards)
+        elif pool is None:
+            df_clean, audit = clean_df(df, outliers, return_audit=True)
+        else:
+            df_clean, audit = clean_df_parallel(df, pool, n_shards, outliers, return_audit=True)
+        out = write_table(df_clean, procdir / csv.stem, **storage)
+        state_path.write_text(json.dumps(state))
+        scope = f"{len(groups)} changed countries" if previous_tables is not None else "all countries"
+        log = (f"🧮 {memory_mb(df):.1f} MB raw -> {memory_mb(df_clean):.1f} MB cleaned in memory ({scope})\n"
+               f"📝 Wrote cleaned data to {out}")
+    audit_out = write_table(audit, audit_path, **storage)
+    return log + f"\n🚩 {len(audit)} outlying values removed, audit in {audit_out}"
 
-def main():
+def main(force=False):
     cfg = load_config()
     rawdir = Path(cfg["data"]["raw_dir"])
     procdir = Path(cfg["data"]["processed_dir"])
     procdir.mkdir(parents=True, exist_ok=True)
-    for csv in rawdir.glob("*.csv"):
-        print(f"🔄 Processing {csv.name}")
-        df = pd.read_csv(csv)
-        df_clean = clean_df(df)
-        out = procdir / csv.name
-        df_clean.to_csv(out, index=False)
-        print(f"📝 Wrote cleaned data to {out}")
+    opts = cfg.get("preprocessing", {})
+    chunk_mb = opts.get("chunk_mb")
+    workers = opts.get("workers") or os.cpu_count() or 1
+    shard_mb = opts.get("shard_mb", 64)
+    outliers = opts.get("outliers")
+    block_years = opts.get("block_years", 10) if opts.get("incremental", True) else None
+    storage = storage_options(cfg)
+    # Everything that shapes the output, so a config change also forces a rerun
+    settings = {"outliers": {**DEFAULT_OUTLIERS, **(outliers or {})}, "block_years": block_years,
+                "chunk_mb": chunk_mb, "storage": storage}
+    stamp = procdir / INPUTS_STAMP
+    if not force and not inputs_changed(rawdir, stamp, settings):
+        print(f"⏭ Raw data and preprocessing settings unchanged since last run "
+              f"(see {rawdir}/manifest.json), skipping")
+        return
+    if force:
+        # Forget the partition fingerprints so every country is recleaned
+        for state in procdir.glob(f"*{PARTITIONS_SUFFIX}"):
+            state.unlink()
+    files = sorted(rawdir.glob("*.csv"))
+    # Large in-memory files are sharded by country across the pool from here;
+    # every other file is cleaned whole by a worker
+    sharded = [csv for csv in files if workers > 1 and csv.stat().st_size > shard_mb * 2**20
+               and not (chunk_mb and csv.stat().st_size > chunk_mb * 2**20)]
+    with ProcessPoolExecutor(workers) as pool:
+        jobs = {csv: pool.submit(_clean_file, csv, procdir, chunk_mb, storage, outliers, block_years)
+                for csv in files if csv not in sharded}
+        for csv in files:
+            print(f"🔄 Processing {csv.name}")
+            if csv in sharded:
+                print(_clean_file(csv, procdir, chunk_mb, storage, outliers, block_years, pool, workers))
+            else:
+                print(jobs[csv].result())
+    record_inputs(rawdir, stamp, settings)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,102 @@
+"""
+Headless figure rendering.
+
+A figure is described by a picklable FigureSpec: an output path, a
+module-level ``draw(ax, **kwargs)`` function and its keyword arguments,
+plus labels and styling. render draws it on a standalone
+``matplotlib.figure.Figure`` with an Agg canvas, so no pyplot figure
+manager or global state is involved and the seaborn theme is applied
+through an rc context rather than ``sns.set_theme``. render_all spreads a
+batch of specs across worker processes that are pinned to the Agg backend.
+matplotlib and seaborn are only imported once something is rendered.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class FigureSpec(NamedTuple):
+    """Everything needed to render one figure file; ``draw`` must be importable for worker processes."""
+    path: str
+    draw: Callable
+    kwargs: Optional[Dict] = None
+    title: str = ""
+    xlabel: Optional[str] = None
+    ylabel: Optional[str] = None
+    figsize: Tuple[float, float] = (8, 5)
+    dpi: int = 150
+    style: str = "whitegrid"
+    palette: Optional[str] = None
+    legend: bool = False
+    tight: bool = False
+
+
+def lines(ax, data, x: str, y: str, hue: Optional[str] = None, marker: Optional[str] = None,
+          band: Optional[Tuple[str, str]] = None):
+    """
+    One line per ``hue`` group (or a single line), drawn straight with
+    matplotlib; ``band`` names the low/high columns of a shaded interval.
+    """
+    groups = data.groupby(hue, sort=True, observed=True) if hue else [(None, data)]
+    for label, group in groups:
+        xs = group[x].to_numpy()
+        (line,) = ax.plot(xs, group[y].to_numpy(), marker=marker,
+                          label=None if label is None else str(label))
+        if band:
+            ax.fill_between(xs, group[band[0]].to_numpy(dtype="float64"),
+                            group[band[1]].to_numpy(dtype="float64"),
+                            color=line.get_color(), alpha=0.2, linewidth=0)
+
+
+def _theme(style: str, palette: Optional[str]) -> Dict:
+    """rcParams equivalent to ``sns.set_theme(style=style, palette=palette)``."""
+    import seaborn as sns
+    from cycler import cycler
+    rc = {**sns.plotting_context("notebook"), **sns.axes_style(style)}
+    rc["axes.prop_cycle"] = cycler(color=sns.color_palette(palette or "deep"))
+    return rc
+
+
+def render(spec: FigureSpec) -> str:
+    """Draw ``spec`` on an Agg canvas and save it; returns the output path."""
+    import matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    Path(spec.path).parent.mkdir(parents=True, exist_ok=True)
+    with matplotlib.rc_context(_theme(spec.style, spec.palette)):
+        fig = Figure(figsize=spec.figsize)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        spec.draw(ax, **(spec.kwargs or {}))
+        ax.set_title(spec.title)
+        if spec.xlabel is not None:
+            ax.set_xlabel(spec.xlabel)
+        if spec.ylabel is not None:
+            ax.set_ylabel(spec.ylabel)
+        if spec.legend:
+            ax.legend()
+        # A tight bounding box costs a second full draw, so it is opt-in
+        fig.savefig(spec.path, dpi=spec.dpi, bbox_inches="tight" if spec.tight else None)
+    return str(spec.path)
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+
+def render_all(specs: Sequence[FigureSpec], workers: Optional[int] = None) -> List[str]:
+    """
+    Render every spec, on ``workers`` processes (default: every core, at
+    most one per spec; 1 renders inline). Returns the output paths in order.
+    """
+    specs = list(specs)
+    workers = min(workers or os.cpu_count() or 1, max(len(specs), 1))
+    if workers == 1:
+        return [render(s) for s in specs]
+    chunksize = max(1, len(specs) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        return list(pool.map(render, specs, chunksize=chunksize))
@@ -1,26 +1,174 @@
-import yaml, pandas as pd
+import yaml, pandas as pd, numpy as np
 from pathlib import Path
+from energy_analysis.cache import frame_fingerprint, open_cache, result_key
+from energy_analysis.storage import read_table, storage_options, write_table
+
+KEY_COLUMNS = ["country", "iso_code", "year"]
+HORIZON = 2050
+# Share of primary energy saved per unit of demand moved to electric end use
+ELECTRIFICATION_SAVING = 0.5
 
 def load_config():
     return yaml.safe_load(open("config.yaml"))
 
-def run_scenarios(df, scenarios):
-    res = []
-    for s in scenarios:
-        tmp = df.copy()
-        tmp["cons_adj"] = tmp["primary_energy_consumption"] * (1+s["gdp_growth"]) / (1+s["carbon_price"]/1000)
-        tmp["scenario"] = s["name"]
-        res.append(tmp)
-    return pd.concat(res, ignore_index=True)
+def scenario_table(scenarios):
+    """Scenario parameters as a frame with one row per scenario, from config dicts or a frame."""
+    params = pd.DataFrame(scenarios).reset_index(drop=True)
+    if "name" not in params:
+        params["name"] = [f"scenario_{i}" for i in range(len(params))]
+    return params
+
+def adjustment_matrix(consumption, params):
+    """(scenarios, rows) matrix of adjusted consumption, broadcast in one step."""
+    factor = (1 + params["gdp_growth"].to_numpy()) / (1 + params["carbon_price"].to_numpy() / 1000)
+    return factor[:, None] * np.asarray(consumption, dtype="float64")[None, :]
+
+def _repeat_keys(df, n):
+    """Key columns of ``df`` tiled ``n`` times; categoricals are tiled by code."""
+    keys = {}
+    for col in KEY_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            keys[col] = pd.Categorical.from_codes(np.tile(values.cat.codes.to_numpy(), n), dtype=values.dtype)
+        else:
+            keys[col] = np.tile(values.to_numpy(), n)
+    return keys
+
+def run_scenarios(df, scenarios, wide=False):
+    """
+    Evaluate every scenario against ``df`` at once.
+
+    ``scenarios`` is a list of scenario dicts (as in config.yaml) or a frame of
+    them. The adjustments are computed as one scenarios x rows matrix, and the
+    result holds only the key columns and outputs: long (one row per scenario
+    and input row, ``scenario`` categorical) or, with ``wide``, one
+    ``cons_adj`` column per scenario.
+    """
+    params = scenario_table(scenarios)
+    adj = adjustment_matrix(df["primary_energy_consumption"], params)
+    return _scenario_frame(df, params["name"].astype(str), adj, wide)
+
+def _scenario_frame(df, names, adj, wide):
+    """Result frame of run_scenarios from the (scenarios, rows) matrix ``adj``."""
+    if wide:
+        keys = _repeat_keys(df, 1)
+        return pd.DataFrame({**keys, **{f"cons_adj_{name}": row for name, row in zip(names, adj)}})
+    n_scen, n_rows = adj.shape
+    scenario = pd.Categorical.from_codes(np.repeat(np.arange(n_scen), n_rows), categories=pd.Index(names))
+    return pd.DataFrame({**_repeat_keys(df, n_scen), "cons_adj": adj.ravel(), "scenario": scenario})
+
+def annual_multipliers(params, n_years, electrification_saving=ELECTRIFICATION_SAVING):
+    """
+    (scenarios, 1, years) demand multipliers, one per projected year.
+
+    Each year demand per head grows with GDP per head (gdp_growth), the
+    population grows (population_growth), energy intensity falls
+    (efficiency_improvement) and a further electrification_rate of demand
+    moves to electric end use, saving ``electrification_saving`` of its primary energy.
+    """
+    col = lambda name: params[name].to_numpy(dtype="float64")[:, None, None]
+    step = ((1 + col("gdp_growth")) * (1 + col("population_growth"))
+            * (1 - col("efficiency_improvement")) * (1 - col("electrification_rate") * electrification_saving))
+    return np.broadcast_to(step, (len(params), 1, n_years))
+
+def log_growth(params, steps, electrification_saving=ELECTRIFICATION_SAVING):
+    """
+    Log of the projected consumption multiplier ``t`` years past the base
+    year, log(1 / (1 + carbon_price / 1000)) + t * log(annual multiplier),
+    for every row of ``params``. ``steps`` broadcasts against a trailing
+    axis: a vector of horizons gives (rows, horizons), and a (rows, k) array
+    gives each row its own horizons.
+    """
+    log_level = -np.log1p(params["carbon_price"].to_numpy(dtype="float64") / 1000)
+    log_step = np.log(annual_multipliers(params, 1, electrification_saving)[:, 0, 0])
+    return log_level[:, None] + log_step[:, None] * np.asarray(steps, dtype="float64")
+
+def last_observed(df):
+    """Each country's name, last year with observed consumption and that consumption, as arrays."""
+    observed = df.dropna(subset=["primary_energy_consumption"]).sort_values(["country", "year"])
+    last = observed.groupby("country", observed=True, sort=True).tail(1)
+    return (last["country"].astype(str).to_numpy(), last["year"].to_numpy(dtype=np.int64),
+            last["primary_energy_consumption"].to_numpy(dtype="float64"))
+
+def project(df, scenarios, horizon=HORIZON, electrification_saving=ELECTRIFICATION_SAVING):
+    """
+    Project each country's primary energy consumption from its last observed
+    year to ``horizon`` under every scenario.
+
+    The annual multipliers are compounded with one cumulative product over a
+    (scenario, country, year) array; the carbon price scales the whole path
+    once by 1 / (1 + carbon_price / 1000), as in run_scenarios. Returns
+    ``(consumption, countries, years)``, with NaN for years at or before a
+    country's last observation.
+    """
+    params = scenario_table(scenarios)
+    countries, base_year, base = last_observed(df)
+    start = min(int(base_year.min()), horizon) if len(base_year) else horizon
+    years = np.arange(start, horizon + 1)
+    # growth[s, 0, j] is the cumulative multiplier from ``start`` to years[j]
+    growth = np.cumprod(annual_multipliers(params, len(years) - 1, electrification_saving), axis=-1)
+    growth = np.concatenate([np.ones((len(params), 1, 1)), growth], axis=-1)
+    level = 1 / (1 + params["carbon_price"].to_numpy(dtype="float64") / 1000)
+    since_base = growth / growth[:, :, np.minimum(base_year, horizon) - start].transpose(0, 2, 1)
+    out = level[:, None, None] * base[None, :, None] * since_base
+    out[:, years[None, :] <= base_year[:, None]] = np.nan
+    return out, countries, years
+
+def projection_table(df, scenarios, horizon=HORIZON, electrification_saving=ELECTRIFICATION_SAVING):
+    """project() as a long frame of scenario, country, year and projected consumption."""
+    out, countries, years = project(df, scenarios, horizon, electrification_saving)
+    names = scenario_table(scenarios)["name"].astype(str).to_numpy()
+    s, c, y = np.nonzero(~np.isnan(out))
+    return pd.DataFrame({
+        "scenario": pd.Categorical.from_codes(s, categories=pd.Index(names)),
+        "country": pd.Categorical.from_codes(c, categories=pd.Index(countries)),
+        "year": years[y].astype("int16"),
+        "consumption": out[s, c, y],
+    })
+
+def cached_projection(cfg, df):
+    """
+    projection_table for ``cfg["scenarios"]`` with the ``projection``
+    options of config.yaml, through the scenario cache. Every scenario is
+    its own entry, keyed by its parameters (not its name) and the options,
+    so editing one scenario recomputes only that one.
+    """
+    opts = cfg.get("projection", {})
+    cache = open_cache(cfg)
+    if cache is None:
+        return projection_table(df, cfg["scenarios"], **opts)
+    params = scenario_table(cfg["scenarios"])
+    fingerprint = frame_fingerprint(df, ["country", "year", "primary_energy_consumption"])
+    keys = [result_key("projection_table", {"scenario": {k: v for k, v in s.items() if k != "name"}, **opts})
+            for s in params.to_dict("records")]
+    parts = [cache.get(fingerprint, key) for key in keys]
+    missing = [i for i, part in enumerate(parts) if part is None]
+    if missing:
+        fresh = projection_table(df, params.iloc[missing], **opts)
+        codes = fresh["scenario"].cat.codes.to_numpy()
+        for j, i in enumerate(missing):
+            parts[i] = fresh[codes == j].drop(columns="scenario").reset_index(drop=True)
+            cache.put(fingerprint, keys[i], parts[i])
+        cache.evict()
+    names = params["name"].astype(str).to_numpy()
+    scenario = pd.Categorical.from_codes(np.repeat(np.arange(len(parts)), [len(p) for p in parts]),
+                                         categories=pd.Index(names))
+    out = pd.concat(parts, ignore_index=True)
+    out.insert(0, "scenario", scenario)
+    return out
 
 def main():
     cfg = load_config()
     proc = cfg["data"]["processed_dir"]
-    df = pd.read_csv(Path(proc)/"sample_energy.csv")
+    df = read_table(Path(proc)/"sample_energy", columns=KEY_COLUMNS + ["primary_energy_consumption"])
     out = run_scenarios(df, cfg["scenarios"])
-    Path("data/processed").mkdir(exist_ok=True)
-    out.to_csv("data/processed/scenario_results.csv", index=False)
-    print("Wrote data/processed/scenario_results.csv")
+    path = write_table(out, Path(proc)/"scenario_results", **storage_options(cfg))
+    print(f"Wrote {path}")
+    proj = cached_projection(cfg, df)
+    path = write_table(proj, Path(proc)/"scenario_projections", **storage_options(cfg))
+    print(f"Wrote {path}")
 
 if __name__ == "__main__":
     main()
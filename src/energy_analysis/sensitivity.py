@@ -0,0 +1,209 @@
+"""
+Global sensitivity of projected consumption to the scenario parameters.
+
+The model output is total consumption across countries in one projection
+year, from the same kernel as :func:`energy_analysis.scenario.project`, and
+parameters range over the bounds implied by ``monte_carlo.parameters`` in
+config.yaml. Every method builds its whole design matrix up front and
+evaluates it in batches, so tens of thousands of runs take seconds.
+
+  - Morris elementary effects (mu*, sigma) from random one-at-a-time
+    trajectories on a ``levels``-point grid.
+  - Sobol first-order (S1) and total (ST) indices from a scrambled Sobol
+    sequence with the Saltelli design and Saltelli 2010 / Jansen estimators.
+  - One-at-a-time swings from the midpoint, for the tornado plot.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import yaml
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+from energy_analysis.cache import cached, open_cache
+from energy_analysis.rendering import FigureSpec, render
+from energy_analysis.scenario import ELECTRIFICATION_SAVING, HORIZON, last_observed, log_growth
+from energy_analysis.storage import read_table, storage_options, write_table
+
+BATCH_ROWS = 2 ** 16
+
+
+def load_config():
+    return yaml.safe_load(open("config.yaml"))
+
+
+def parameter_bounds(spec: Dict) -> Dict[str, Tuple[float, float]]:
+    """
+    (low, high) for each varying parameter of a monte_carlo ``spec``: the
+    support of uniform and triangular draws, mean +/- 2 sd for normal and
+    the matching interval for lognormal. Fixed parameters are left out.
+    """
+    bounds = {}
+    for name, d in spec.items():
+        if not isinstance(d, dict):
+            continue
+        if d["dist"] in ("uniform", "triangular"):
+            bounds[name] = (d["low"], d["high"])
+        elif d["dist"] == "normal":
+            bounds[name] = (d["mean"] - 2 * d["sd"], d["mean"] + 2 * d["sd"])
+        elif d["dist"] == "lognormal":
+            bounds[name] = tuple(np.exp([d["mean"] - 2 * d["sigma"], d["mean"] + 2 * d["sigma"]]))
+        else:
+            raise ValueError(f"Unknown distribution '{d['dist']}' for parameter '{name}'")
+    return bounds
+
+
+class ConsumptionModel:
+    """
+    Total projected consumption in ``year`` as a function of the scenario
+    parameters, evaluated for a whole design matrix at a time.
+
+    ``fixed`` supplies parameters that are not varied.
+    """
+
+    def __init__(self, df: pd.DataFrame, year: int = HORIZON, fixed: Optional[Dict] = None,
+                 electrification_saving: float = ELECTRIFICATION_SAVING):
+        _, base_year, base = last_observed(df)
+        keep = base_year < year
+        self.log_base = np.log(base[keep])
+        self.steps = (year - base_year[keep]).astype("float64")
+        self.fixed = {k: float(v) for k, v in (fixed or {}).items()}
+        self.electrification_saving = electrification_saving
+
+    def __call__(self, params: pd.DataFrame) -> np.ndarray:
+        out = np.empty(len(params))
+        for lo in range(0, len(params), BATCH_ROWS):
+            batch = params.iloc[lo:lo + BATCH_ROWS].assign(**self.fixed)
+            z = self.log_base[None, :] + log_growth(batch, self.steps, self.electrification_saving)
+            out[lo:lo + BATCH_ROWS] = np.exp(z).sum(axis=1)
+        return out
+
+
+def _scale(unit, bounds):
+    """Map points of the unit cube to parameter values."""
+    low, high = np.array(list(bounds.values()), dtype="float64").T
+    return pd.DataFrame(low + unit * (high - low), columns=list(bounds))
+
+
+def morris(model, bounds: Dict, trajectories: int = 200, levels: int = 4, seed: int = 0) -> pd.DataFrame:
+    """
+    Morris screening: mu, mu* (mean absolute effect) and sigma of the
+    elementary effects per parameter, in output units per unit of the
+    parameter's range.
+    """
+    rng = np.random.default_rng(seed)
+    k = len(bounds)
+    delta = levels / (2 * (levels - 1))
+    # Base points on the grid low enough that a +delta step stays inside [0, 1]
+    grid = np.arange(levels) / (levels - 1)
+    start = rng.choice(grid[grid <= 1 - delta + 1e-12], size=(trajectories, k))
+    order = np.argsort(rng.random((trajectories, k)), axis=1)
+    steps = np.zeros((trajectories, k + 1, k))
+    rows = np.arange(trajectories)
+    for j in range(k):
+        steps[:, j + 1] = steps[:, j]
+        steps[rows, j + 1, order[:, j]] = delta
+    points = start[:, None, :] + steps
+    y = model(_scale(points.reshape(-1, k), bounds)).reshape(trajectories, k + 1)
+    effects = np.empty((trajectories, k))
+    effects[rows[:, None], order] = np.diff(y, axis=1) / delta
+    return pd.DataFrame({
+        "morris_mu": effects.mean(axis=0),
+        "morris_mu_star": np.abs(effects).mean(axis=0),
+        "morris_sigma": effects.std(axis=0, ddof=1),
+    }, index=pd.Index(list(bounds), name="parameter"))
+
+
+def sobol(model, bounds: Dict, samples: int = 8192, seed: int = 0) -> pd.DataFrame:
+    """
+    First-order and total Sobol indices from ``samples * (k + 2)`` model
+    runs on a scrambled Sobol sequence (``samples`` should be a power of two).
+    """
+    k = len(bounds)
+    unit = qmc.Sobol(d=2 * k, scramble=True, seed=seed).random(samples)
+    a, b = unit[:, :k], unit[:, k:]
+    ab = np.repeat(a[None], k, axis=0)
+    ab[np.arange(k), :, np.arange(k)] = b.T
+    y = model(_scale(np.concatenate([a, b, ab.reshape(-1, k)]), bounds))
+    y_a, y_b, y_ab = y[:samples], y[samples:2 * samples], y[2 * samples:].reshape(k, samples)
+    var = np.var(np.r_[y_a, y_b], ddof=1)
+    return pd.DataFrame({
+        "sobol_s1": (y_b * (y_ab - y_a)).mean(axis=1) / var,
+        "sobol_st": 0.5 * ((y_a - y_ab) ** 2).mean(axis=1) / var,
+    }, index=pd.Index(list(bounds), name="parameter"))
+
+
+def one_at_a_time(model, bounds: Dict) -> pd.DataFrame:
+    """Output with each parameter at its low and high bound, the others at their midpoints."""
+    k = len(bounds)
+    unit = np.full((2 * k + 1, k), 0.5)
+    unit[np.arange(k), np.arange(k)] = 0.0
+    unit[k + np.arange(k), np.arange(k)] = 1.0
+    y = model(_scale(unit, bounds))
+    return pd.DataFrame({"at_low": y[:k], "at_high": y[k:2 * k], "at_mid": y[-1]},
+                        index=pd.Index(list(bounds), name="parameter"))
+
+
+def sensitivity_table(df: pd.DataFrame, spec: Dict, year: int = HORIZON, sobol_samples: int = 8192,
+                      morris_trajectories: int = 200, morris_levels: int = 4, seed: int = 0,
+                      electrification_saving: float = ELECTRIFICATION_SAVING) -> pd.DataFrame:
+    """Morris, Sobol and one-at-a-time results per varying parameter, ranked by total Sobol index."""
+    bounds = parameter_bounds(spec)
+    fixed = {k: v for k, v in spec.items() if k not in bounds}
+    model = ConsumptionModel(df, year, fixed, electrification_saving)
+    table = pd.concat([
+        pd.DataFrame(bounds, index=["low", "high"]).T.rename_axis("parameter"),
+        morris(model, bounds, morris_trajectories, morris_levels, seed),
+        sobol(model, bounds, sobol_samples, seed),
+        one_at_a_time(model, bounds),
+    ], axis=1)
+    return table.sort_values("sobol_st", ascending=False).reset_index()
+
+
+def cached_table(cfg: Dict, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    sensitivity_table with the settings of config.yaml (``sensitivity``,
+    ``monte_carlo.parameters`` and ``projection.electrification_saving``),
+    read from the scenario cache when the data and settings are unchanged.
+    """
+    opts = cfg.get("sensitivity", {})
+    saving = cfg.get("projection", {}).get("electrification_saving", ELECTRIFICATION_SAVING)
+    spec = cfg["monte_carlo"]["parameters"]
+    return cached(open_cache(cfg), "sensitivity_table", df,
+                  {"parameters": spec, "electrification_saving": saving, **opts},
+                  lambda: sensitivity_table(df, spec, electrification_saving=saving, **opts),
+                  columns=["country", "year", "primary_energy_consumption"])
+
+
+def bars(ax, table: pd.DataFrame):
+    """One horizontal low/high bar pair per parameter around the midpoint output, widest at the top."""
+    t = table.assign(swing=(table["at_high"] - table["at_low"]).abs()).sort_values("swing")
+    mid = t["at_mid"].iloc[0]
+    ax.barh(t["parameter"], t["at_low"] - mid, left=mid, label="low bound")
+    ax.barh(t["parameter"], t["at_high"] - mid, left=mid, label="high bound")
+    ax.axvline(mid, color="black", linewidth=1)
+
+
+def plot_tornado(table: pd.DataFrame, outdir: str = "figures", year: int = HORIZON):
+    """Tornado plot of the one-at-a-time swings in sensitivity_table, widest at the top."""
+    out = render(FigureSpec(
+        str(Path(outdir)/"sensitivity_tornado.png"), bars, dict(table=table),
+        title="Sensitivity of Projected Consumption to Scenario Parameters",
+        xlabel=f"Total projected consumption in {year}", legend=True, tight=True))
+    print(f"Saved tornado plot to {out}")
+
+
+def main():
+    cfg = load_config()
+    proc = cfg["data"]["processed_dir"]
+    opts = cfg.get("sensitivity", {})
+    df = read_table(Path(proc)/"sample_energy", columns=["country", "year", "primary_energy_consumption"])
+    table = cached_table(cfg, df)
+    path = write_table(table, Path(proc)/"scenario_sensitivity", **storage_options(cfg))
+    print(table.round(4).to_string(index=False))
+    print(f"Wrote {path}")
+    plot_tornado(table, year=opts.get("year", HORIZON))
+
+
+if __name__ == "__main__":
+    main()
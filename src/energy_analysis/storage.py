@@ -0,0 +1,153 @@
+"""
+Columnar storage for processed tables.
+
+Tables are written as Parquet (default) or Arrow IPC, which can be memory-mapped
+on read. Reads support column projection so callers only materialize the columns
+they use. CSV remains available as an opt-in export.
+"""
+
+from pathlib import Path
+from typing import Optional, Sequence
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+
+def resolve_path(path) -> Path:
+    """
+    Return the stored file for ``path``.
+
+    ``path`` may name the file exactly or just its stem; when the exact file is
+    missing the most recently written ``.parquet``, ``.arrow`` or ``.csv``
+    sibling wins (writers remove siblings left over from another format, so
+    normally there is only one).
+    """
+    path = Path(path)
+    if path.suffix in FORMATS.values() and path.exists():
+        return path
+    candidates = [p for p in _siblings(path) if p.exists()]
+    if not candidates:
+        raise FileNotFoundError(f"No stored table found for {path}")
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns)
+
+
+def _siblings(path) -> list:
+    """The file ``path`` would be stored as in every format."""
+    path = Path(path)
+    stem = path.with_suffix("") if path.suffix in FORMATS.values() else path
+    return [stem.with_name(stem.name + suffix) for suffix in FORMATS.values()]
+
+
+def _remove_stale(path, keep):
+    """Delete copies of the table at ``path`` in formats other than those in ``keep``."""
+    for sibling in _siblings(path):
+        if sibling not in keep:
+            sibling.unlink(missing_ok=True)
+
+
+def write_table(
+    df: pd.DataFrame,
+    path,
+    fmt: str = "parquet",
+    export_csv: bool = False
+) -> Path:
+    """
+    Write ``df`` to ``path`` (suffix replaced to match ``fmt``) and return the file written.
+
+    - fmt: "parquet", "arrow" (uncompressed Arrow IPC, memory-mappable) or "csv".
+    - export_csv: also write a CSV copy next to the columnar file.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown storage format '{fmt}', expected one of {list(FORMATS)}")
+    path = Path(path)
+    stem = path.with_suffix("") if path.suffix in FORMATS.values() else path
+    out = stem.with_name(stem.name + FORMATS[fmt])
+    out.parent.mkdir(parents=True, exist_ok=True)
+    keep = {out}
+    if export_csv and fmt != "csv":
+        # Written first so the columnar file stays the newest, which a stem lookup prefers
+        keep.add(stem.with_name(stem.name + ".csv"))
+        df.to_csv(stem.with_name(stem.name + ".csv"), index=False)
+    if fmt == "parquet":
+        df.to_parquet(out, index=False)
+    elif fmt == "arrow":
+        feather.write_feather(df.reset_index(drop=True), out, compression="uncompressed")
+    else:
+        df.to_csv(out, index=False)
+    _remove_stale(out, keep)
+    return out
+
+
+class TableWriter:
+    """
+    Append DataFrames with a fixed schema to one table file, for outputs too
+    large to build in memory. Use as a context manager; see :func:`write_table`
+    for ``fmt`` and ``export_csv``.
+    """
+
+    def __init__(self, path, fmt: str = "parquet", export_csv: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown storage format '{fmt}', expected one of {list(FORMATS)}")
+        path = Path(path)
+        stem = path.with_suffix("") if path.suffix in FORMATS.values() else path
+        self.path = stem.with_name(stem.name + FORMATS[fmt])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.csv_path = stem.with_name(stem.name + ".csv") if (export_csv or fmt == "csv") else None
+        self._writer = None
+        self._csv_header = True
+
+    def write(self, df: pd.DataFrame):
+        if self.fmt != "csv":
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.fmt == "parquet":
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._writer = pa.ipc.new_file(str(self.path), table.schema)
+            self._writer.write_table(table)
+        if self.csv_path is not None:
+            df.to_csv(self.csv_path, mode="w" if self._csv_header else "a",
+                      header=self._csv_header, index=False)
+            self._csv_header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        _remove_stale(self.path, {self.path, self.csv_path})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_table(path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Read a stored table, loading only ``columns`` when given.
+
+    Arrow IPC files are memory-mapped, so projected columns are the only ones
+    paged in.
+    """
+    path = resolve_path(path)
+    columns = list(columns) if columns is not None else None
+    if path.suffix == ".parquet":
+        return pq.read_table(path, columns=columns).to_pandas()
+    if path.suffix == ".arrow":
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            return table.to_pandas()
+    return pd.read_csv(path, usecols=columns)
+
+
+def storage_options(cfg) -> dict:
+    """Keyword arguments for :func:`write_table` from the ``data.storage`` config block."""
+    opts = cfg["data"].get("storage", {})
+    return {"fmt": opts.get("format", "parquet"), "export_csv": opts.get("export_csv", False)}
@@ -1,15 +1,16 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
+from energy_analysis.aggregation import summarize
+from energy_analysis.rendering import FigureSpec, lines, render
+from energy_analysis.storage import read_table
 
-def plot_scenarios(scen_csv, outdir="figures"):
-    df = pd.read_csv(scen_csv)
-    Path(outdir).mkdir(exist_ok=True)
-    sns.set_theme(style="whitegrid", palette="muted")
-    plt.figure(figsize=(8,5))
-    sns.lineplot(data=df, x="year", y="cons_adj", hue="scenario")
-    plt.title("Scenario-adjusted Energy Consumption")
-    plt.savefig(Path(outdir)/"scenario_comparison.png", dpi=150)
-    plt.close()
-    print(f"Saved scenario comparison to {outdir}/scenario_comparison.png")
+def plot_scenarios(scen_table, outdir="figures", ci="normal", level=0.95):
+    df = read_table(scen_table, columns=["year", "cons_adj", "scenario"])
+    # Mean across countries per scenario-year, with its confidence band
+    summary = summarize(df, "cons_adj", x="year", by="scenario", ci=ci, level=level)
+    out = render(FigureSpec(
+        str(Path(outdir)/"scenario_comparison.png"), lines,
+        dict(data=summary, x="year", y="cons_adj", hue="scenario",
+             band=("low", "high") if ci else None),
+        title="Scenario-adjusted Energy Consumption", xlabel="year", ylabel="cons_adj",
+        palette="muted", legend=True))
+    print(f"Saved scenario comparison to {out}")
@@ -0,0 +1,52 @@
+"""cached() and cached_projection() hits and misses."""
+
+import numpy as np
+import pandas as pd
+
+from energy_analysis import scenario
+from energy_analysis.cache import ScenarioCache, cached
+from energy_analysis.scenario import projection_table, scenario_table
+
+
+def test_cached_recomputes_only_when_data_or_params_change(tmp_path):
+    cache = ScenarioCache(tmp_path)
+    df = pd.DataFrame({"country": ["A", "B"], "year": [2000, 2000], "primary_energy_consumption": [1.0, 2.0]})
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return pd.DataFrame({"total": [df["primary_energy_consumption"].sum()]})
+
+    first = cached(cache, "total", df, {"horizon": 2050}, compute)
+    pd.testing.assert_frame_equal(cached(cache, "total", df, {"horizon": 2050}, compute), first)
+    assert len(calls) == 1
+    cached(cache, "total", df, {"horizon": 2060}, compute)
+    cached(cache, "other", df, {"horizon": 2050}, compute)
+    df.loc[0, "primary_energy_consumption"] = 3.0
+    cached(cache, "total", df, {"horizon": 2050}, compute)
+    assert len(calls) == 4
+    assert cached(None, "total", df, {}, compute)["total"].item() == 5.0
+
+
+def test_cached_projection_recomputes_only_edited_scenarios(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"country": np.repeat(["A", "B", "C"], 5), "year": np.tile(np.arange(2016, 2021), 3),
+                       "primary_energy_consumption": rng.lognormal(5, 1, 15)})
+    scenarios = [{"name": name, "carbon_price": price, "gdp_growth": 0.03, "population_growth": 0.01,
+                  "efficiency_improvement": 0.005, "electrification_rate": 0.02}
+                 for name, price in (("low", 20), ("mid", 50), ("high", 100))]
+    cfg = {"scenarios": scenarios, "projection": {"horizon": 2030},
+           "scenario_cache": {"dir": str(tmp_path / "cache")}}
+    computed = []
+
+    def counting(df, scenarios, **opts):
+        computed.append(list(scenario_table(scenarios)["name"]))
+        return projection_table(df, scenarios, **opts)
+
+    monkeypatch.setattr(scenario, "projection_table", counting)
+    first = scenario.cached_projection(cfg, df)
+    pd.testing.assert_frame_equal(first, projection_table(df, scenarios, horizon=2030))
+    edited = [scenarios[0], {**scenarios[1], "carbon_price": 60}, scenarios[2]]
+    second = scenario.cached_projection({**cfg, "scenarios": edited}, df)
+    pd.testing.assert_frame_equal(second, projection_table(df, edited, horizon=2030))
+    assert computed == [["low", "mid", "high"], ["mid"]]
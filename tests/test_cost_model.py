@@ -0,0 +1,19 @@
+"""cost_frame switching to LCOE when capacity factors are given."""
+
+import numpy as np
+import pandas as pd
+
+from energy_analysis.analysis.cost_model import cost_frame
+from energy_analysis.analysis.lcoe import lcoe
+
+
+def test_cost_frame_returns_lcoe_of_learning_adjusted_capex():
+    df = pd.DataFrame({"technology": ["solar"] * 3 + ["wind"] * 3, "year": [2020, 2021, 2022] * 2,
+                       "capex": [1000, 900, 800, 1500, 1400, 1300], "cumulative_capacity": [1, 2, 4] * 2,
+                       "capacity_factor": [0.2] * 3 + [0.35] * 3, "fixed_opex": [20] * 3 + [40] * 3},
+                      index=list("abcdef"))
+    capex = cost_frame(df.drop(columns="capacity_factor"))["cost"]
+    out = cost_frame(df, discount_rate=0.05)
+    expected = lcoe(capex.to_numpy(), df["capacity_factor"].to_numpy(), 0.05, fixed_opex=df["fixed_opex"].to_numpy())
+    np.testing.assert_allclose(out["cost"].to_numpy(), expected)
+    assert out.index.equals(df.index)
@@ -0,0 +1,201 @@
+"""download_source against a local Range-capable http.server."""
+
+import gzip
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from energy_analysis.data_ingest import (download_source, ingest_sources, inputs_changed, load_manifest,
+                                        record_inputs, save_manifest)
+
+PAYLOAD = b"".join(b"country,year,value\nWorld,%d,%d\n" % (1900 + i, i * 7) for i in range(4000))
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves ``server.payload`` with Range support, misbehaving as the server's flags say."""
+
+    def do_GET(self):
+        srv = self.server
+        srv.requests.append(dict(self.headers))
+        if srv.fail_times:
+            srv.fail_times -= 1
+            self.send_error(503)
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+        body = srv.payload
+        wanted = self.headers.get("Range")
+        start = 0
+        if wanted and not srv.ignore_range:
+            start = int(wanted.split("=", 1)[1].rstrip("-"))
+            if srv.always_416 or start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        data = body[start:]
+        if srv.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        if srv.truncate_once:
+            # Drop the connection half way through the first response
+            srv.truncate_once = False
+            self.wfile.write(data[:len(data) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.payload = PAYLOAD
+    srv.requests = []
+    srv.ignore_range = srv.always_416 = srv.gzip = srv.truncate_once = False
+    srv.fail_times = 0
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/data.csv"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def fetch(server, outdir, **kwargs):
+    return download_source("sample", server.url, outdir, chunk_size=1024, timeout=5, **kwargs)
+
+
+def test_full_download(server, tmp_path):
+    entry = fetch(server, tmp_path, sha256=hashlib.sha256(PAYLOAD).hexdigest())
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert not (tmp_path / "sample.csv.part").exists()
+    assert entry["size"] == len(PAYLOAD)
+    assert entry["sha256"] == hashlib.sha256(PAYLOAD).hexdigest()
+    assert entry["etag"] == '"v1"'
+
+
+def test_resume_after_truncated_transfer(server, tmp_path):
+    server.truncate_once = True
+    fetch(server, tmp_path)
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert len(server.requests) == 2
+    assert server.requests[1]["Range"].startswith("bytes=")
+    assert int(server.requests[1]["Range"][6:-1]) > 0
+    assert server.requests[1]["If-Range"] == '"v1"'
+
+
+def test_server_ignoring_range_restarts(server, tmp_path):
+    server.ignore_range = True
+    (tmp_path / "sample.csv.part").write_bytes(b"stale partial bytes")
+    fetch(server, tmp_path)
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert "Range" in server.requests[0]
+
+
+def test_416_with_complete_part_file(server, tmp_path):
+    (tmp_path / "sample.csv.part").write_bytes(PAYLOAD)
+    fetch(server, tmp_path)
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert len(server.requests) == 1
+
+
+def test_416_with_bad_part_file_refetches(server, tmp_path):
+    server.always_416 = True
+    (tmp_path / "sample.csv.part").write_bytes(b"junk")
+    fetch(server, tmp_path)
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert "Range" not in server.requests[-1]
+
+
+def test_sha256_mismatch(server, tmp_path):
+    with pytest.raises(ValueError, match="sha256 mismatch"):
+        fetch(server, tmp_path, sha256="0" * 64)
+    assert not (tmp_path / "sample.csv").exists()
+    assert not (tmp_path / "sample.csv.part").exists()
+
+
+def test_gzip_capable_server(server, tmp_path):
+    server.gzip = True
+    fetch(server, tmp_path)
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert all(r["Accept-Encoding"] == "identity" for r in server.requests)
+
+
+def test_gzip_capable_server_on_resume(server, tmp_path):
+    server.gzip = True
+    server.truncate_once = True
+    fetch(server, tmp_path)
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+    assert all(r["Accept-Encoding"] == "identity" for r in server.requests)
+
+
+def test_ingest_retries_server_errors_once_per_attempt(server, tmp_path):
+    server.fail_times = 2
+    [report] = ingest_sources([{"name": "sample", "url": server.url}], tmp_path, retries=3, backoff=0.0)
+    assert report["status"] == "downloaded"
+    assert report["attempts"] == 3
+    assert len(server.requests) == 3
+    assert (tmp_path / "sample.csv").read_bytes() == PAYLOAD
+
+
+def test_ingest_does_not_retry_oversized_download(server, tmp_path):
+    [report] = ingest_sources([{"name": "sample", "url": server.url, "size": 100}], tmp_path, retries=3)
+    assert report["status"] == "failed"
+    assert "expected 100" in report["error"]
+    assert report["attempts"] == 1
+    assert len(server.requests) == 1
+
+
+def test_ingest_does_not_retry_sha256_mismatch(server, tmp_path):
+    [report] = ingest_sources([{"name": "sample", "url": server.url, "sha256": "0" * 64}], tmp_path, retries=3)
+    assert report["status"] == "failed"
+    assert len(server.requests) == 1
+
+
+def test_ingest_resumes_go_through_rate_limiter(server, tmp_path):
+    server.truncate_once = True
+    [report] = ingest_sources([{"name": "sample", "url": server.url}], tmp_path, min_interval=0.3, backoff=0.0)
+    assert report["status"] == "downloaded"
+    assert report["attempts"] == 2
+    assert report["seconds"] >= 0.3
+
+
+def test_ingest_revalidates_with_etag(server, tmp_path):
+    [first] = ingest_sources([{"name": "sample", "url": server.url}], tmp_path, backoff=0.0)
+    assert first["status"] == "downloaded"
+    manifest = load_manifest(tmp_path)
+    mtime = (tmp_path / "sample.csv").stat().st_mtime_ns
+    [second] = ingest_sources([{"name": "sample", "url": server.url}], tmp_path, backoff=0.0)
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+    assert second["status"] == "unchanged"
+    assert second["entry"] == first["entry"]
+    assert (tmp_path / "sample.csv").stat().st_mtime_ns == mtime
+    assert load_manifest(tmp_path) == manifest
+
+
+def test_inputs_stamp_tracks_settings(tmp_path):
+    save_manifest(tmp_path, {"sample": {"sha256": "abc"}})
+    stamp = tmp_path / "stamp.json"
+    settings = {"outliers": {"threshold": 3.5}, "block_years": 10}
+    assert inputs_changed(tmp_path, stamp, settings)
+    record_inputs(tmp_path, stamp, settings)
+    assert not inputs_changed(tmp_path, stamp, settings)
+    assert inputs_changed(tmp_path, stamp, {**settings, "outliers": {"threshold": 1.0}})
+    save_manifest(tmp_path, {"sample": {"sha256": "def"}})
+    assert inputs_changed(tmp_path, stamp, settings)
@@ -0,0 +1,24 @@
+"""grouped_learning_curve over several grouping columns."""
+
+import numpy as np
+import pandas as pd
+
+from energy_analysis.analysis.learning_curve import grouped_learning_curve, learning_curve
+from energy_analysis.analysis.learning_fit import fit_learning_rates
+
+
+def test_fitted_multiindex_rates_feed_back_in():
+    rng = np.random.default_rng(0)
+    parts = []
+    for tech in ("solar", "wind"):
+        for region in ("EU", "US"):
+            cum = np.cumsum(rng.uniform(1, 5, 10))
+            parts.append(pd.DataFrame({"technology": tech, "region": region, "cumulative_capacity": cum,
+                                       "capex": 1000 * cum ** -0.3 * rng.lognormal(0, 0.02, 10)}))
+    df = pd.concat(parts, ignore_index=True).sample(frac=1, random_state=1).astype({"region": "category"})
+    rates = fit_learning_rates(df, ["technology", "region"])["exponent"]
+    adjusted = grouped_learning_curve(df, ["technology", "region"], learning_rate=rates.drop(("wind", "US")))
+    for (tech, region), group in df.groupby(["technology", "region"], observed=True):
+        rate = 0.1 if (tech, region) == ("wind", "US") else rates[(tech, region)]
+        expected = learning_curve(group["capex"].to_numpy(), group["cumulative_capacity"].to_numpy(), rate)
+        np.testing.assert_allclose(adjusted[group.index].to_numpy(), expected.to_numpy())
@@ -0,0 +1,74 @@
+"""Sharded, out-of-core and incremental cleaning against the in-memory clean_df."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_analysis.preprocessing import _clean_file, clean_csv_chunked, clean_df, clean_df_parallel, read_raw
+from energy_analysis.storage import read_table, write_table
+
+
+def raw_frame(n_countries=12, n_years=40, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "country": np.repeat([f"Country {i:02d}" for i in range(n_countries)], n_years),
+        "year": np.tile(np.arange(1980, 1980 + n_years), n_countries),
+        "population": rng.lognormal(15, 1, n_countries * n_years),
+        "primary_energy_consumption": rng.lognormal(5, 1, n_countries * n_years),
+        "empty": np.nan,
+    })
+    df.loc[rng.integers(0, len(df), 3), "primary_energy_consumption"] *= 50
+    df.loc[rng.random(len(df)) < 0.1, "primary_energy_consumption"] = np.nan
+    # Duplicates and shuffled raw order, as in the downloaded files
+    df = pd.concat([df, df.sample(25, random_state=seed)])
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("outliers", [None, {"method": "mad", "threshold": 1.0}, {"method": "zscore", "by": None}])
+def test_parallel_matches_serial(outliers):
+    df = raw_frame()
+    expected, expected_audit = clean_df(df, outliers, return_audit=True)
+    with ThreadPoolExecutor(3) as pool:
+        cleaned, audit = clean_df_parallel(df, pool, 5, outliers, return_audit=True)
+    pd.testing.assert_frame_equal(cleaned, expected)
+    pd.testing.assert_frame_equal(audit, expected_audit)
+    assert "empty" not in cleaned.columns
+    assert len(expected_audit)
+
+
+def stored(df, path):
+    """``df`` after a round trip through storage, as the file-based paths return it."""
+    return read_table(write_table(df, path))
+
+
+@pytest.mark.parametrize("outliers", [None, {"method": "mad"}, {"method": "zscore", "by": None, "threshold": 3.0}])
+def test_chunked_matches_in_memory(outliers, tmp_path):
+    csv = tmp_path / "raw.csv"
+    raw_frame(n_countries=30).to_csv(csv, index=False)
+    expected, expected_audit = clean_df(read_raw(csv), outliers, return_audit=True)
+    # About 10 KB chunks, so the file is spilled in several pieces
+    path, audit = clean_csv_chunked(csv, tmp_path / "out" / "raw", chunk_mb=0.01, outliers=outliers)
+    pd.testing.assert_frame_equal(read_table(path), stored(expected, tmp_path / "expected"))
+    pd.testing.assert_frame_equal(audit, expected_audit, check_categorical=False)
+
+
+def test_incremental_matches_full_reclean(tmp_path):
+    csv, procdir = tmp_path / "raw" / "energy.csv", tmp_path / "processed"
+    csv.parent.mkdir()
+    procdir.mkdir()
+    storage = {"fmt": "parquet", "export_csv": False}
+    df = raw_frame()
+    df.to_csv(csv, index=False)
+    _clean_file(csv, procdir, None, storage, block_years=10)
+    # Edit one value of one country and append a row to another
+    df.loc[df.index[(df["country"] == "Country 03").to_numpy()][5], "primary_energy_consumption"] *= 40
+    extra = df[df["country"] == "Country 07"].nlargest(1, "year").assign(year=lambda d: d["year"] + 1)
+    pd.concat([df, extra], ignore_index=True).to_csv(csv, index=False)
+    log = _clean_file(csv, procdir, None, storage, block_years=10)
+    assert "2 changed countries" in log
+    expected, expected_audit = clean_df(read_raw(csv), return_audit=True)
+    pd.testing.assert_frame_equal(read_table(procdir / "energy"), stored(expected, tmp_path / "expected"))
+    pd.testing.assert_frame_equal(read_table(procdir / "energy_outliers"),
+                                  stored(expected_audit, tmp_path / "expected_audit"))
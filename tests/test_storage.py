@@ -0,0 +1,27 @@
+"""Stem lookups after switching storage formats."""
+
+import pandas as pd
+
+from energy_analysis.storage import TableWriter, read_table, resolve_path, write_table
+
+
+def test_switching_format_replaces_old_file(tmp_path):
+    write_table(pd.DataFrame({"x": [1]}), tmp_path / "t", fmt="parquet")
+    write_table(pd.DataFrame({"x": [2]}), tmp_path / "t", fmt="arrow")
+    assert read_table(tmp_path / "t")["x"].tolist() == [2]
+    assert not (tmp_path / "t.parquet").exists()
+
+
+def test_csv_write_agrees_with_stem_lookup(tmp_path):
+    write_table(pd.DataFrame({"x": [1]}), tmp_path / "t", fmt="arrow")
+    write_table(pd.DataFrame({"x": [3]}), tmp_path / "t", fmt="csv")
+    assert read_table(tmp_path / "t").equals(read_table(tmp_path / "t.csv"))
+
+
+def test_csv_export_keeps_columnar_file_preferred(tmp_path):
+    write_table(pd.DataFrame({"x": [1]}), tmp_path / "t", fmt="parquet", export_csv=True)
+    assert resolve_path(tmp_path / "t").suffix == ".parquet"
+    with TableWriter(tmp_path / "t", fmt="arrow", export_csv=True) as writer:
+        writer.write(pd.DataFrame({"x": [2]}))
+    assert resolve_path(tmp_path / "t").suffix == ".arrow"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["t.arrow", "t.csv"]